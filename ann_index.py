@@ -0,0 +1,82 @@
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+ANN_DIMENSIONS = 128  # SVD components the TF-IDF rows are reduced to
+KMEANS_BATCH_SIZE = 4096
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbor index over TF-IDF rows.
+    Rows are reduced to dense vectors with a truncated SVD and clustered with
+    k-means into cells. A query only visits the rows of the cells whose
+    centroids are closest to it, so its cost grows with the cell size rather
+    than with the catalog. Candidates are returned as row indices; callers
+    rank them with exact TF-IDF scores. Named groups of rows (e.g. one per
+    language) get posting lists of their own, so a query restricted to a
+    group never touches the rows outside it.
+    """
+
+    def __init__(self, svd, centroids, labels, groups=None):
+        self.svd = svd
+        self.centroids = centroids  # (n_lists, dimensions), L2-normalized
+        self.labels = labels  # Cell of every row
+        # Group name (None for all rows) -> (rows ordered by cell, cell offsets)
+        self.lists = {None: self._posting_lists(np.arange(len(labels)))}
+        for name, mask in (groups or {}).items():
+            self.lists[name] = self._posting_lists(np.flatnonzero(mask))
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    def _posting_lists(self, rows):
+        """Rows grouped by cell, with the offset of every cell's first row"""
+        rows = rows[np.argsort(self.labels[rows], kind="stable")].astype(np.int32)
+        sizes = np.bincount(self.labels[rows], minlength=self.n_lists)
+        return rows, np.concatenate(([0], np.cumsum(sizes)))
+
+    @classmethod
+    def build(
+        cls, matrix, dimensions=ANN_DIMENSIONS, n_lists=None, seed=0, groups=None
+    ):
+        """
+        Fit the SVD and cells for a TF-IDF matrix (about sqrt(n) cells).
+        `groups` maps names to boolean row masks, see candidates().
+        """
+        n_rows, n_features = matrix.shape
+        n_lists = min(n_lists or int(np.sqrt(n_rows)), n_rows) or 1
+        svd = TruncatedSVD(
+            n_components=max(1, min(dimensions, n_features - 1)), random_state=seed
+        )
+        vectors = normalize(svd.fit_transform(matrix))
+
+        kmeans = MiniBatchKMeans(
+            n_clusters=n_lists,
+            random_state=seed,
+            batch_size=KMEANS_BATCH_SIZE,
+            n_init=3,
+        )
+        labels = kmeans.fit_predict(vectors).astype(np.int32)
+        return cls(svd, normalize(kmeans.cluster_centers_), labels, groups)
+
+    def candidates(self, vector, n_probe, min_candidates=0, group=None):
+        """
+        Rows in the `n_probe` cells nearest to `vector` (a 1 x n_features
+        TF-IDF row), only of the named `group` if one is given. More cells
+        are probed until at least `min_candidates` rows are found. The cost
+        is in the number of cells and candidates, not in the catalog size.
+        """
+        order, offsets = self.lists[group]
+        query = normalize(self.svd.transform(vector))[0]
+        cells = np.argsort(-(self.centroids @ query), kind="stable")
+
+        sizes = np.diff(offsets)
+        needed = np.searchsorted(np.cumsum(sizes[cells]), min_candidates) + 1
+        probe = cells[: max(n_probe, needed)]
+
+        return np.concatenate(
+            [order[offsets[cell] : offsets[cell + 1]] for cell in probe]
+        )
@@ -1,14 +1,26 @@
 from flask import Flask, request, jsonify, render_template
 from flask_cors import CORS
-import random
-import json
 import os
-from optimized_movie_recommender import MovieRecommender
+from optimized_movie_recommender import SEARCH_BATCH_MAX_QUERIES, SEARCH_ENGINES, get_recommender
+from movie_payloads import parse_fields
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['X-Next-Cursor'])
 
-recommender = MovieRecommender()
+# Built on first use rather than at import: spawned worker processes (see
+# text_preprocessing.py) re-import this module and must not build their own
+recommender = None
+
+@app.before_request
+def load_recommender():
+    global recommender
+    if recommender is None:
+        recommender = get_recommender()
+
+def movies_response(ranked):
+    """Splice pre-encoded movie JSON (projected to fields=) into a response"""
+    fields = parse_fields(request.args.get('fields'))
+    return app.response_class(recommender.movies_json(ranked, fields), mimetype='application/json')
 
 @app.route('/')
 def index():
@@ -18,8 +30,17 @@ def index():
 def api_random():
     limit = int(request.args.get('limit', 10))
     lang = request.args.get('language', None)
-    movies = [movie for movie in recommender.movies if not lang or movie.get("language") == lang]
-    return jsonify(random.sample(movies, min(limit, len(movies))))
+
+    # Pages of a per-session shuffle; the next page's cursor is in a header
+    try:
+        rows, scores, next_cursor = recommender.browse(limit, lang, request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    response = movies_response((rows, scores))
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @app.route("/api/search")
 def search_movies():
@@ -27,14 +48,16 @@ def search_movies():
     query = request.args.get("query", "").strip()
     limit = int(request.args.get("limit", 10))
     language = request.args.get("language", None)
-    
+    engine = request.args.get("engine", None)
+
+    if engine and engine not in SEARCH_ENGINES:
+        return jsonify({"error": f"engine must be one of {SEARCH_ENGINES}"}), 400
     if not query:
-        return jsonify(recommender._get_random_recommendations(limit, language))
+        return movies_response(recommender.rank_random(limit, language))
     
     try:
-        # Use search_movies_enhanced instead of trying to parse the query separately
-        results = recommender.search_movies_enhanced(query, limit, language)
-        return jsonify(results)
+        # Use rank_search instead of trying to parse the query separately
+        return movies_response(recommender.rank_search(query, limit, language, engine))
     except Exception as e:
         print(f"Error during search: {str(e)}")
         return jsonify({"error": f"Search failed: {str(e)}"}), 500
@@ -67,27 +90,93 @@ def search_movies():
     print(f"[DEBUG] Found {len(results)} semantic matches for: {query}")
     return jsonify(results)
 
+@app.route('/api/search/batch', methods=['POST'])
+def api_search_batch():
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    queries = payload.get('queries')
+    language = payload.get('language')
+    try:
+        limit = int(payload.get('limit', 10))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    if language is not None and not isinstance(language, str):
+        return jsonify({'error': 'language must be a string'}), 400
+    if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+        return jsonify({'error': 'queries must be a list of strings'}), 400
+    if len(queries) > SEARCH_BATCH_MAX_QUERIES:
+        return jsonify({'error': f'At most {SEARCH_BATCH_MAX_QUERIES} queries'}), 400
+
+    try:
+        ranked = recommender.rank_search_many([q.strip() for q in queries], limit, language)
+        fields = parse_fields(payload.get('fields') or request.args.get('fields'))
+        body = ','.join(recommender.movies_json(r, fields) for r in ranked)
+        return app.response_class(f'[{body}]', mimetype='application/json')
+    except Exception as e:
+        print(f"Error during batch search: {str(e)}")
+        return jsonify({"error": f"Search failed: {str(e)}"}), 500
+
 @app.route('/api/movie/<int:movie_id>')
 def api_movie_detail(movie_id):
-    movie = next((m for m in recommender.movies if m['id'] == movie_id), None)
+    movie = recommender.get_movie(movie_id)
     if movie:
         return jsonify(movie)
     else:
         return jsonify({'error': 'Movie not found'}), 404
 
+@app.route('/api/trailer/<int:movie_id>')
+def api_trailer(movie_id):
+    try:
+        key = recommender.get_trailer_key(movie_id)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    if key is None:
+        return jsonify({'error': 'Trailer not found'}), 404
+    return jsonify({'key': key})
+
 @app.route('/api/recommend')
 def api_recommend():
-    movie_id = int(request.args.get('movie_id'))
     limit = int(request.args.get('limit', 5))
     lang = request.args.get('language', None)
+    engine = request.args.get('engine', None)
+
+    if engine and engine not in SEARCH_ENGINES:
+        return jsonify({'error': f'engine must be one of {SEARCH_ENGINES}'}), 400
+    if request.args.get('movie_ids'):
+        return recommend_for_movies(limit, lang)
 
-    movie = next((m for m in recommender.movies if m['id'] == movie_id), None)
+    movie_id = int(request.args.get('movie_id'))
+
+    movie = recommender.get_movie(movie_id)
     if not movie:
         return jsonify({'error': 'Movie not found'}), 404
 
-    same_lang = [m for m in recommender.movies if m.get('language') == movie.get('language') and m['id'] != movie_id]
-    return jsonify(random.sample(same_lang, min(limit, len(same_lang))))
+    ranked = recommender.rank_recommendations(movie_id, limit, lang, engine)
+    if isinstance(ranked, dict):
+        return jsonify(ranked)
+    return movies_response(ranked)
+
+def recommend_for_movies(limit, lang):
+    """"More like these": movie_ids=1,2,3 with optional weights=2,1,1"""
+    try:
+        movie_ids = [int(i) for i in request.args['movie_ids'].split(',') if i.strip()]
+        weights = request.args.get('weights')
+        weights = [float(w) for w in weights.split(',')] if weights else None
+    except ValueError:
+        return jsonify({'error': 'Invalid movie_ids or weights'}), 400
+
+    ranked = recommender.rank_for_movies(movie_ids, limit, lang, weights)
+    if isinstance(ranked, dict):
+        return jsonify(ranked), 400
+    return movies_response(ranked)
+
+@app.route('/api/cache/stats')
+def api_cache_stats():
+    return jsonify(recommender.cache_stats())
 
 if __name__ == '__main__':
+    recommender = get_recommender()  # Load before serving the first request
     port = int(os.environ.get("PORT", 5500))  # default for local
     app.run(host='0.0.0.0', port=port)
@@ -0,0 +1,77 @@
+import heapq
+import itertools
+import threading
+
+PRIOR_YIELD = 0.5  # Assumed share of useful results on an untried source
+PRIOR_WEIGHT = 20  # How many results that assumption is worth (about a page)
+POLL_INTERVAL = 0.1  # Seconds between checks for cancellation while waiting
+
+
+class CrawlFrontier:
+    """
+    Priority queue of list pages to crawl, ranked by how productive their
+    source has been: the share of its results so far that were new movies
+    the crawl still wanted, smoothed towards PRIOR_YIELD so untried sources
+    get a turn. Each source has at most one page queued or in flight; its
+    next page is queued when the previous one is recorded, so its rank
+    always reflects the latest yield. Sources need a unique `label` and a
+    `pages` limit; `wanted(source)` drops sources that are no longer useful
+    (e.g. whose quota is met) when they come up.
+    """
+
+    def __init__(self, sources, wanted=lambda source: True):
+        self.wanted = wanted
+        self._heap = []  # (-expected yield, order, source, page)
+        self._order = itertools.count()  # Ties keep the declared source order
+        self._stats = {}  # Label -> [useful results, results]
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        for source in sources:
+            self._stats[source.label] = [0, 0]
+            self._push(source, 1)
+
+    def expected_yield(self, label):
+        """Smoothed share of useful results on a source's pages"""
+        useful, results = self._stats[label]
+        return (useful + PRIOR_YIELD * PRIOR_WEIGHT) / (results + PRIOR_WEIGHT)
+
+    def tasks(self, stopped=lambda: False, ready=lambda: True):
+        """
+        Yield (source, page) in priority order until no page is queued or in
+        flight, or stopped() is true. Waits for ready() before taking each
+        page, so the choice is made as late as possible. Every yielded page
+        must be reported back with record().
+        """
+        while True:
+            with self._cond:
+                while not stopped() and (
+                    (not self._heap and self._in_flight) or not ready()
+                ):
+                    self._cond.wait(POLL_INTERVAL)
+                if not self._heap or stopped():
+                    return
+                _, _, source, page = heapq.heappop(self._heap)
+                if not self.wanted(source):
+                    continue
+                self._in_flight += 1
+            yield source, page
+
+    def record(self, source, page, results=0, useful=0, total_pages=None):
+        """
+        Report a crawled page: how many results it had, how many of them were
+        useful, and the source's page count if it is known. Queues the
+        source's next page, if it has one.
+        """
+        with self._cond:
+            stats = self._stats[source.label]
+            stats[0] += useful
+            stats[1] += results
+            self._in_flight -= 1
+            last_page = min(source.pages, total_pages or source.pages)
+            if page < last_page:
+                self._push(source, page + 1)
+            self._cond.notify_all()
+
+    def _push(self, source, page):
+        priority = -self.expected_yield(source.label)
+        heapq.heappush(self._heap, (priority, next(self._order), source, page))
@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+
+COMPACT_MIN_RECORDS = 1000  # Never compact for fewer log records than this
+
+
+class DatasetStore:
+    """
+    Movie records kept as a compacted NDJSON file plus an append-only NDJSON
+    log of newer records. Checkpoints only append the records that changed,
+    and compaction rewrites the dataset to a temp file that is atomically
+    renamed over the old one, so a crash never leaves a truncated dataset.
+    Records are keyed by "id"; a later record for the same id replaces the
+    earlier one.
+    """
+
+    def __init__(self, path, log_path, legacy_path=None):
+        self.path = path
+        self.log_path = log_path
+        self.legacy_path = legacy_path
+        self.log_records = 0  # Records in the log since the last compaction
+        self.base_records = 0  # Records in the compacted file
+        self._skipped = 0  # Unreadable records seen by the last load()
+        self._lock = threading.Lock()
+
+    def exists(self):
+        """Whether any stored dataset (current or legacy format) is present"""
+        return any(
+            path and os.path.exists(path)
+            for path in (self.path, self.log_path, self.legacy_path)
+        )
+
+    def load(self):
+        """Stream the compacted file and the log into a list of movies"""
+        fresh = not os.path.exists(self.path) and not os.path.exists(self.log_path)
+        if fresh and self._migrate_legacy():
+            print(f"Migrated {self.legacy_path} to {self.path}")
+
+        movies = []
+        rows = {}
+        self._skipped = 0
+        self.base_records = self._read_into(self.path, movies, rows)
+        self.log_records = self._read_into(self.log_path, movies, rows)
+
+        if self._skipped:
+            # Rewrite without the torn records so later appends start on a
+            # clean line
+            self.compact(movies)
+        return movies
+
+    def append(self, movies):
+        """Durably append records to the log"""
+        if not movies:
+            return
+        lines = "".join(
+            json.dumps(movie, ensure_ascii=False) + "\n" for movie in movies
+        )
+        with self._lock:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            self.log_records += len(movies)
+
+    def should_compact(self):
+        """Compact once the log outgrows half of the compacted file"""
+        return self.log_records >= max(COMPACT_MIN_RECORDS, self.base_records // 2)
+
+    def compact(self, movies):
+        """
+        Rewrite the full dataset atomically and truncate the log. `movies`
+        must include every record appended so far.
+        """
+        with self._lock:
+            tmp_path = f"{self.path}.tmp-{os.getpid()}"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for movie in movies:
+                    f.write(json.dumps(movie, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+            # Everything in the log is now in the compacted file
+            if os.path.exists(self.log_path):
+                os.remove(self.log_path)
+            self.base_records = len(movies)
+            self.log_records = 0
+
+    def _read_into(self, path, movies, rows):
+        """Upsert the records of one NDJSON file into movies; return the count"""
+        if not os.path.exists(path):
+            return 0
+
+        count = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    movie = json.loads(line)
+                except json.JSONDecodeError:
+                    # Most likely a write torn by a crash; the rest is intact
+                    print(f"Skipping unreadable record {path}:{line_number}")
+                    self._skipped += 1
+                    continue
+
+                row = rows.get(movie["id"])
+                if row is None:
+                    rows[movie["id"]] = len(movies)
+                    movies.append(movie)
+                else:
+                    movies[row] = movie
+                count += 1
+        return count
+
+    def _migrate_legacy(self):
+        """Convert a legacy single-array JSON dataset; return True on success"""
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return False
+        try:
+            with open(self.legacy_path, "r", encoding="utf-8") as f:
+                movies = json.load(f)
+        except json.JSONDecodeError:
+            print(f"Error parsing {self.legacy_path}; not migrating it.")
+            return False
+        self.compact(movies)
+        return True
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Bump when the on-disk layout changes so that old snapshots are ignored
+# instead of being loaded with the wrong meaning. Preprocessing changes are
+# covered by the preprocessing version in the fingerprint.
+SNAPSHOT_VERSION = 1
+
+MATRIX_ARRAYS = ("data", "indices", "indptr")
+
+
+def fingerprint_documents(movies, preprocess_version):
+    """
+    Hash the (id, document) pairs the TF-IDF index is built from, and the
+    version of the preprocessing applied to the documents
+    """
+    digest = hashlib.sha256()
+    digest.update(f"preprocess v{preprocess_version}\0".encode("utf-8"))
+    for movie in movies:
+        digest.update(str(movie["id"]).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(movie.get("document", "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def fingerprint_records(movies, fields):
+    """Hash selected fields of every movie, for tables built from more than text"""
+    digest = hashlib.sha256()
+    for movie in movies:
+        values = [movie.get(field) for field in fields]
+        digest.update(json.dumps(values, ensure_ascii=False).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def save_snapshot(directory, fingerprint, vectorizer, matrix, preprocess_version):
+    """
+    Write the fitted vocabulary/idf and the CSR arrays of `matrix` to
+    `directory`. The snapshot is written to a temporary directory first and
+    swapped in afterwards, so readers never see a half-written snapshot.
+    """
+    # Unique per writer: a background rebuild may save while another
+    # recommender in the same process does
+    tmp_dir = f"{directory}.tmp-{os.getpid()}-{threading.get_ident()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    matrix = matrix.tocsr(copy=True)
+    matrix.sort_indices()
+    for name in MATRIX_ARRAYS:
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), getattr(matrix, name))
+    np.save(os.path.join(tmp_dir, "idf.npy"), vectorizer.idf_)
+
+    vocabulary = {term: int(col) for term, col in vectorizer.vocabulary_.items()}
+    with open(os.path.join(tmp_dir, "vocabulary.json"), "w", encoding="utf-8") as f:
+        json.dump(vocabulary, f, ensure_ascii=False)
+
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "fingerprint": fingerprint,
+        "preprocess_version": preprocess_version,
+        "shape": list(matrix.shape),
+        "max_features": vectorizer.max_features,
+    }
+    # meta.json is written last: its presence marks a complete snapshot
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+
+
+def load_snapshot(directory, fingerprint, max_features):
+    """
+    Return (vectorizer, matrix) from a snapshot matching `fingerprint`, or None.
+    The CSR arrays are memory-mapped read-only, so loading is O(1) in the
+    matrix size and pages are shared with other processes by the OS.
+    """
+    meta = _read_meta(directory, fingerprint)
+    if meta is None or meta.get("max_features") != max_features:
+        return None
+
+    try:
+        with open(os.path.join(directory, "vocabulary.json"), encoding="utf-8") as f:
+            vocabulary = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+            for name in MATRIX_ARRAYS
+        }
+        idf = np.load(os.path.join(directory, "idf.npy"))
+    except (OSError, ValueError, EOFError) as e:
+        print(f"Ignoring unreadable index snapshot: {e}")
+        return None
+
+    vectorizer = TfidfVectorizer(max_features=max_features)
+    vectorizer.vocabulary_ = vocabulary
+    vectorizer.idf_ = idf
+
+    matrix = csr_matrix(
+        (arrays["data"], arrays["indices"], arrays["indptr"]),
+        shape=tuple(meta["shape"]),
+        copy=False,
+    )
+    matrix.has_sorted_indices = True
+    return vectorizer, matrix
+
+
+def save_arrays(directory, fingerprint, name, key, arrays, meta=None):
+    """
+    Add a named group of arrays (plus JSON-able `meta`) to the snapshot for
+    `fingerprint`, for tables derived after the matrix was saved. `key`
+    identifies whatever else the group was built from. Returns False when
+    the snapshot on disk belongs to another fingerprint. The fingerprint is
+    also stored with the group, since another worker may replace the
+    snapshot between that check and the write.
+    """
+    if _read_meta(directory, fingerprint) is None:
+        return False
+
+    target = os.path.join(directory, name)
+    tmp_dir = f"{target}.tmp-{os.getpid()}-{threading.get_ident()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for array_name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{array_name}.npy"), array)
+
+    group = {
+        "fingerprint": fingerprint,
+        "key": key,
+        "arrays": list(arrays),
+        "meta": meta or {},
+    }
+    # group.json is written last: its presence marks a complete group
+    with open(os.path.join(tmp_dir, "group.json"), "w", encoding="utf-8") as f:
+        json.dump(group, f, ensure_ascii=False)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp_dir, target)
+    return True
+
+
+def load_arrays(directory, fingerprint, name, key):
+    """
+    Return (arrays, meta) for a group written by save_arrays with the same
+    fingerprint and key, or None. Arrays are memory-mapped read-only like the
+    matrix, so every process attaching to the snapshot shares their pages.
+    """
+    if _read_meta(directory, fingerprint) is None:
+        return None
+
+    group_dir = os.path.join(directory, name)
+    if not os.path.exists(os.path.join(group_dir, "group.json")):
+        return None
+    try:
+        with open(os.path.join(group_dir, "group.json"), encoding="utf-8") as f:
+            group = json.load(f)
+        if group.get("fingerprint") != fingerprint or group.get("key") != key:
+            return None
+        arrays = {
+            array_name: np.load(
+                os.path.join(group_dir, f"{array_name}.npy"), mmap_mode="r"
+            )
+            for array_name in group["arrays"]
+        }
+    except (OSError, ValueError, KeyError, EOFError) as e:
+        print(f"Ignoring unreadable snapshot group {name}: {e}")
+        return None
+    return arrays, group["meta"]
+
+
+def _read_meta(directory, fingerprint):
+    """Return the snapshot's meta.json if it is current for `fingerprint`"""
+    try:
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if (
+        meta.get("version") != SNAPSHOT_VERSION
+        or meta.get("fingerprint") != fingerprint
+    ):
+        return None
+    return meta
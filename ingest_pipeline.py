@@ -0,0 +1,129 @@
+import queue
+import threading
+
+PIPELINE_QUEUE_SIZE = 64  # Items buffered between two stages
+POLL_INTERVAL = 0.1  # Seconds between checks for cancellation while blocked
+
+_DONE = object()  # End-of-stream marker passed down the queues
+
+
+class Pipeline:
+    """
+    Staged worker pipeline connected by bounded queues. Tasks flow through
+    the stages in order; every stage runs a fixed number of worker threads
+    for the whole run, and its function turns one input item into any
+    number of items for the next stage. The last stage's items are handed
+    to a sink on the calling thread, which is therefore the single writer.
+    A full queue blocks the stage feeding it, so a slow stage throttles the
+    ones before it instead of letting work pile up. stop() cancels every
+    stage: queued items are dropped and workers exit after their current
+    item.
+    """
+
+    def __init__(self, stages, queue_size=PIPELINE_QUEUE_SIZE):
+        self.stages = stages  # [(name, fn, workers)]; fn(item) -> iterable
+        self.queue_size = queue_size
+        self.processed = {name: 0 for name, _, _ in stages}  # Items per stage
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    def stop(self):
+        """Cancel the run; safe to call from any thread, including the sink"""
+        self._stop.set()
+
+    def run(self, tasks, sink):
+        """
+        Push `tasks` (any iterable, consumed lazily) through the stages and
+        call sink(item) for every item leaving the last stage. Returns once
+        everything is processed or the pipeline is stopped.
+        """
+        # Tasks are pulled only as the first stage has room for them, so a
+        # lazy task source decides as late as possible
+        queues = [queue.Queue(self.stages[0][2])]
+        queues += [queue.Queue(self.queue_size) for _ in self.stages]
+        threads = [threading.Thread(target=self._feed, args=(tasks, queues[0]))]
+        for i, (name, fn, workers) in enumerate(self.stages):
+            running = [workers]  # Workers left; the last one closes the stage
+            threads += [
+                threading.Thread(
+                    target=self._work,
+                    args=(name, fn, queues[i], queues[i + 1], running),
+                    name=f"pipeline-{name}-{n}",
+                )
+                for n in range(workers)
+            ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        try:
+            while True:
+                item = self._get(queues[-1])
+                if item is _DONE:
+                    break
+                try:
+                    sink(item)
+                except Exception as e:
+                    print(f"Error writing pipeline item: {e}")
+        finally:
+            self.stop()  # Releases workers still blocked on a full queue
+            for thread in threads:
+                thread.join()
+
+    def _feed(self, tasks, out):
+        """Producer thread: queue the tasks, then the end-of-stream marker"""
+        try:
+            for task in tasks:
+                if not self._put(out, task):
+                    return
+        except Exception as e:
+            print(f"Error generating pipeline tasks: {e}")
+        self._put(out, _DONE)
+
+    def _work(self, name, fn, inbox, out, running):
+        """Worker thread of one stage"""
+        while True:
+            item = self._get(inbox)
+            if item is _DONE:
+                break
+            try:
+                for result in fn(item):
+                    if not self._put(out, result):
+                        return
+            except Exception as e:
+                print(f"Error in pipeline stage {name}: {e}")
+            with self._lock:
+                self.processed[name] += 1
+
+        if self.stopped:
+            return
+        # Let sibling workers see the marker; the last one passes it on
+        self._put(inbox, _DONE)
+        with self._lock:
+            running[0] -= 1
+            last = running[0] == 0
+        if last:
+            self._put(out, _DONE)
+
+    def _put(self, q, item):
+        """Blocking put that gives up (returning False) once stopped"""
+        while not self.stopped:
+            try:
+                q.put(item, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        """Blocking get that returns _DONE once stopped"""
+        while not self.stopped:
+            try:
+                return q.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _DONE
@@ -0,0 +1,89 @@
+import json
+import math
+import threading
+from collections import OrderedDict
+
+# Fields the movie cards in static/js/script.js render; list responses carry
+# only these unless the client asks for more with `fields=`
+DEFAULT_FIELDS = (
+    "id",
+    "title",
+    "poster_path",
+    "release_date",
+    "vote_average",
+    "language",
+    "genres",
+)
+ALL_FIELDS = "all"  # fields=all returns complete movie records
+MAX_PROJECTIONS = 16  # Distinct `fields=` projections kept encoded
+
+
+def parse_fields(value):
+    """
+    Turn a `fields=` parameter ("id,title,...") into a projection tuple;
+    None means every field. Missing or empty values give DEFAULT_FIELDS.
+    """
+    if not value or not value.strip():
+        return DEFAULT_FIELDS
+    if value.strip() == ALL_FIELDS:
+        return None
+    fields = (field.strip() for field in value.split(","))
+    return tuple(dict.fromkeys(field for field in fields if field))
+
+
+class MoviePayloads:
+    """
+    Pre-encoded JSON fragments of movie records, one per projection and row.
+    A fragment is the movie's JSON object without its closing brace, so a
+    response is assembled by appending each result's similarity score and
+    joining fragments, without copying or re-serializing movie dicts.
+    Fragments remember the movie dict they were encoded from and are
+    re-encoded once that row is replaced.
+    """
+
+    def __init__(self, max_projections=MAX_PROJECTIONS):
+        self.max_projections = max_projections
+        self._tables = OrderedDict()  # Projection -> {row: (movie, fragment)}
+        self._lock = threading.Lock()
+
+    def warm(self, movies, fields=DEFAULT_FIELDS):
+        """Encode every movie for a projection ahead of the first request"""
+        table = self._table(fields)
+        for row, movie in enumerate(movies):
+            table[row] = (movie, self._encode(movie, fields))
+
+    def render(self, movies, rows, scores, fields=DEFAULT_FIELDS):
+        """JSON array of the movies at `rows`, each with its similarity score"""
+        table = self._table(fields)
+        parts = []
+        for row, score in zip(rows, scores):
+            row = int(row)
+            movie = movies[row]
+            entry = table.get(row)
+            if entry is None or entry[0] is not movie:
+                entry = table[row] = (movie, self._encode(movie, fields))
+            # JSON has no NaN or Infinity; an undefined score is sent as null
+            score = float(score)
+            similarity = repr(score) if math.isfinite(score) else "null"
+            parts.append(f'{entry[1]}"similarity":{similarity}}}')
+        return "[" + ",".join(parts) + "]"
+
+    def _table(self, fields):
+        """Fragment table of one projection (least recently used one evicted)"""
+        with self._lock:
+            table = self._tables.get(fields)
+            if table is None:
+                table = self._tables[fields] = {}
+                if len(self._tables) > self.max_projections:
+                    self._tables.popitem(last=False)
+            else:
+                self._tables.move_to_end(fields)
+            return table
+
+    @staticmethod
+    def _encode(movie, fields):
+        """Open JSON object for `movie` restricted to `fields`, ready for more keys"""
+        if fields is not None:
+            movie = {field: movie[field] for field in fields if field in movie}
+        encoded = json.dumps(movie, ensure_ascii=False)[:-1]
+        return encoded if encoded == "{" else encoded + ","
@@ -1,44 +1,57 @@
 import os
 import json
-import nltk
+import base64
+import bisect
+import math
 import numpy as np
-import requests
 import time
-import re
 from flask import Flask, request, jsonify, render_template
 from flask import send_from_directory
 from flask_cors import CORS
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from datetime import datetime
+from scipy.sparse import csr_matrix, issparse
+import sys
+from datetime import datetime, timedelta, timezone
 import random
-from functools import lru_cache
+import threading
+from contextlib import contextmanager
+from functools import partial
 from concurrent.futures import ThreadPoolExecutor
-from functools import lru_cache
 import difflib
-from collections import defaultdict
-
-# Set custom NLTK data path for compatibility with Render
-NLTK_DATA_PATH = "/tmp/nltk_data"
-os.makedirs(NLTK_DATA_PATH, exist_ok=True)
-nltk.data.path.append(NLTK_DATA_PATH)
-
-# Download NLTK resources (safe even if repeated)
-nltk.download("punkt", download_dir=NLTK_DATA_PATH, quiet=True)
-nltk.download("punkt_tab", download_dir=NLTK_DATA_PATH, quiet=True)
-nltk.download("wordnet", download_dir=NLTK_DATA_PATH, quiet=True)
-nltk.download("stopwords", download_dir=NLTK_DATA_PATH, quiet=True)
-
-app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+from collections import defaultdict, namedtuple
+from tmdb_client import ResponseCache, TMDBClient
+from dataset_store import DatasetStore
+from ingest_pipeline import Pipeline
+from crawl_frontier import CrawlFrontier
+from lru_ttl_cache import LRUCache, SingleFlight
+from query_analyzer import QueryAnalyzer
+from ann_index import IVFIndex
+from movie_payloads import DEFAULT_FIELDS, MoviePayloads, parse_fields
+from text_preprocessing import (
+    PREPROCESS_VERSION,
+    ensure_nltk_resources,
+    preprocess_documents,
+)
+from index_snapshot import (
+    fingerprint_documents,
+    fingerprint_records,
+    load_arrays,
+    load_snapshot,
+    save_arrays,
+    save_snapshot,
+)
 
 # Constants
-DATA_FILE = "movie_data.json"
+DATA_FILE = "movie_data.ndjson"  # Compacted dataset, see dataset_store.py
+DATA_LOG_FILE = "movie_data.log.ndjson"  # Records appended since compaction
+LEGACY_DATA_FILE = "movie_data.json"  # Pre-NDJSON format, migrated on load
+INDEX_SNAPSHOT_DIR = "index_snapshot"  # Persisted TF-IDF index, see index_snapshot.py
+PREPROCESS_CACHE_FILE = "preprocess_cache.json"  # Preprocessed text per document
 API_KEY_FILE = "tmdb_api_key.txt"
-TMDB_BASE_URL = "https://api.themoviedb.org/3"
+TMDB_CACHE_FILE = "tmdb_cache.sqlite3"  # On-disk TMDB response cache
+SYNC_STATE_FILE = "sync_state.json"  # Last TMDB change-feed sync, see refresh
+# Overridable so ingestion can be pointed at a local TMDB stand-in
+TMDB_BASE_URL = os.environ.get("TMDB_BASE_URL", "https://api.themoviedb.org/3")
 
 # Updated target counts - focusing only on Hollywood and Bollywood
 HOLLYWOOD_COUNT = 100  # Increase count on deployement
@@ -48,33 +61,363 @@ BOLLYWOOD_COUNT = 300  # Increase count on deployement
 TARGET_MOVIE_COUNT = HOLLYWOOD_COUNT + BOLLYWOOD_COUNT
 
 # Constants for optimized fetching
-MAX_THREADS = 3  # Default: 5
-CACHE_SIZE = 50  # Default: 1000
-BATCH_SIZE = 10  # Process movies in batches, Default: 20
+# Worker threads per fetch stage; throughput is bounded by the shared TMDB rate
+# limiter in tmdb_client, so this only needs to be high enough to keep it busy
+MAX_THREADS = int(os.environ.get("TMDB_MAX_THREADS", 8))
+
+# How old a cached TMDB response may be before ingestion fetches it again
+DETAILS_MAX_AGE = 30 * 24 * 3600  # Movie details (credits, keywords)
+LIST_MAX_AGE = 24 * 3600  # List/discover pages, whose contents shift daily
+PERSON_MAX_AGE = 7 * 24 * 3600  # Person searches and filmographies
+GENRES_MAX_AGE = 7 * 24 * 3600  # The genre list, which hardly ever changes
+
+# Trailer lookups (/api/trailer)
+# Collect trailer keys with the movie details during ingestion (same request)
+FETCH_TRAILERS = os.environ.get("TMDB_FETCH_TRAILERS", "1") != "0"
+DETAILS_APPEND = "credits,keywords,videos" if FETCH_TRAILERS else "credits,keywords"
+TRAILER_CACHE_SIZE = 10000  # Movies whose trailer lookup is kept in memory
+TRAILER_TTL = 24 * 3600  # Seconds a looked-up trailer key is served
+TRAILER_MISS_TTL = 3600  # Seconds "no trailer" is served before asking again
+
+# Cached TMDB responses older than any max_age above are never served again and
+# are deleted from the on-disk cache (on startup and after each refresh)
+TMDB_CACHE_RETENTION = max(
+    DETAILS_MAX_AGE, LIST_MAX_AGE, PERSON_MAX_AGE, GENRES_MAX_AGE, TRAILER_MISS_TTL
+)
+
+# Search result cache
+SEARCH_CACHE_SIZE = 1000  # Entries
+SEARCH_CACHE_TTL = 3600  # Seconds before a cached result is recomputed
+SEARCH_CACHE_MAX_BYTES = 16 * 1024 * 1024  # Budget for cached (rows, scores)
+
+SEARCH_BATCH_MAX_QUERIES = 200  # Queries accepted by one /api/search/batch call
+_MISSING = object()  # Cache sentinel, since None is a valid cached result
+
+# Infinite-scroll browsing (/api/random)
+BROWSE_ROUNDS = 4  # Feistel rounds of the per-session shuffle
+
+# Staged crawl (see _crawl); worker counts are limits for the whole crawl
+CRAWL_LANGUAGES = ("en", "hi")  # Original languages the dataset keeps
+CRAWL_PAGE_WORKERS = 2  # List pages fetched concurrently
+CRAWL_DETAIL_WORKERS = MAX_THREADS  # Movie details fetched concurrently
+CRAWL_DETAIL_BACKLOG = 4 * CRAWL_DETAIL_WORKERS  # Ids waiting before pages pause
+CRAWL_CHECKPOINT_EVERY = 100  # Movies added between dataset checkpoints
+# Add movies from list pages alone and fetch their details (cast, director,
+# keywords) in the background, so the catalog is usable after the list pages
+TIERED_INGESTION = os.environ.get("TMDB_TIERED_INGESTION", "1") != "0"
+ENRICH_BATCH = 200  # Enriched movies applied (and checkpointed) together
+ENRICH_REINDEX_INTERVAL = 300  # Seconds between index rebuilds while enriching
+
+# Appended to the search document of movies found through Bollywood sources
+BOLLYWOOD_TAGS = " bollywood hindi indian"
+
+# Delta refresh from TMDB's change feed
+CHANGES_WINDOW_DAYS = 14  # TMDB's maximum start_date..end_date span
+# Hours between automatic refreshes in the server process; 0 disables them
+REFRESH_INTERVAL_HOURS = float(os.environ.get("TMDB_REFRESH_HOURS", 0))
+
+TFIDF_MAX_FEATURES = 4000
+
+# Movie fields _build_feature_columns reads; the shared copy of the feature
+# columns is reused only while these are unchanged
+FEATURE_FIELDS = (
+    "id",
+    "genres",
+    "release_date",
+    "cast",
+    "overview",
+    "keywords",
+    "language",
+)
+FEATURES_VERSION = 1  # Bump when _build_feature_columns or MOOD_KEYWORDS change
+
+# Precomputed recommendation neighbors
+NEIGHBOR_K = 100  # Neighbors stored per movie (per language table too)
+NEIGHBOR_BLOCK_CELLS = 16_000_000  # Dense similarity cells per block (~64 MB)
+
+# Approximate nearest-neighbor search, see ann_index.py
+SEARCH_ENGINES = ("exact", "ivf")
+SEARCH_ENGINE = os.environ.get("SEARCH_ENGINE", "exact")  # Default per-request engine
+ANN_MIN_MOVIES = 2000  # Smaller catalogs are always scored exactly
+ANN_PROBE = 8  # IVF cells visited per query
+ANN_CANDIDATE_FACTOR = 10  # Probe until limit * factor candidate rows are found
+
+# Keywords associated with each mood, used to boost mood searches
+MOOD_KEYWORDS = {
+    "happy": [
+        "uplifting",
+        "cheerful",
+        "joyful",
+        "optimistic",
+        "fun",
+        "heartwarming",
+    ],
+    "sad": [
+        "tragic",
+        "melancholy",
+        "grief",
+        "depression",
+        "emotional",
+        "heartbreaking",
+    ],
+    "scary": [
+        "horror",
+        "terror",
+        "nightmare",
+        "creepy",
+        "haunting",
+        "frightening",
+        "supernatural",
+    ],
+    "tense": [
+        "suspense",
+        "thriller",
+        "anxiety",
+        "adrenaline",
+        "intense",
+        "psychological",
+    ],
+    "funny": [
+        "comedy",
+        "laugh",
+        "humorous",
+        "gag",
+        "joke",
+        "silly",
+        "parody",
+        "satire",
+    ],
+    "inspirational": [
+        "triumph",
+        "overcome",
+        "motivational",
+        "journey",
+        "victory",
+        "success",
+    ],
+    "romantic": [
+        "love",
+        "romance",
+        "relationship",
+        "passion",
+        "dating",
+        "marriage",
+    ],
+    "thought-provoking": [
+        "philosophical",
+        "deep",
+        "contemplative",
+        "existential",
+        "meaningful",
+    ],
+}
+MOOD_COLUMNS = {mood: col for col, mood in enumerate(MOOD_KEYWORDS)}
+
+
+# Where a crawl finds movies: up to `pages` pages of a TMDB list endpoint, or
+# the credits of the person a "search/person" query finds. `category` is the
+# quota the source is crawled for; `language` restricts accepted movies to
+# one original language ("hi" sources also tag them as Bollywood) and `year`
+# keeps only movies released in that year.
+CrawlSource = namedtuple(
+    "CrawlSource",
+    ["label", "category", "endpoint", "params", "pages", "language", "year"],
+    defaults=({}, 1, None, None),
+)
+
+
+# Everything a query reads from one build of the TF-IDF index: the fitted
+# vectorizer and matrix, the boost columns (see _build_feature_columns), the
+# language partitions (see _build_partitions), the dataset version it was
+# built from and its (snapshot fingerprint, features key). A rebuild
+# publishes a new one in a single assignment, so a request that takes one
+# reference never mixes parts of two builds.
+TfidfIndex = namedtuple(
+    "TfidfIndex",
+    ["vectorizer", "matrix", "features", "partitions", "version", "keys"],
+)
+
+
+def _category(language):
+    """Crawl quota a movie counts towards"""
+    return "bollywood" if language == "hi" else "hollywood"
+
+
+def _ranked_nbytes(ranked):
+    """Memory held by a cached (rows, scores) search result"""
+    return sum(array.nbytes for array in ranked)
+
+
+def _positions_in(sorted_rows, targets):
+    """Positions within the sorted array `sorted_rows` of the `targets` it holds"""
+    targets = np.asarray(targets, dtype=np.int64)
+    at = np.searchsorted(sorted_rows, targets)
+    found = at < len(sorted_rows)
+    found[found] = sorted_rows[at[found]] == targets[found]
+    return at[found]
+
+
+def _trailer_key(videos):
+    """YouTube key of the first trailer in a TMDB videos response, or None"""
+    for video in videos.get("results", []):
+        if video.get("site") == "YouTube" and video.get("type") == "Trailer":
+            return video.get("key")
+    return None
+
+
+def _encode_cursor(seed, count, offset, language):
+    """Opaque browse cursor: session seed, pool size, next offset, language"""
+    token = json.dumps([seed, count, offset, language], separators=(",", ":"))
+    return base64.urlsafe_b64encode(token.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor):
+    """Inverse of _encode_cursor; raises ValueError for a malformed cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        seed, count, offset, language = json.loads(base64.urlsafe_b64decode(padded))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}") from None
+    # Exact ints (not bools) in the range sessions use, so a forged cursor
+    # cannot overflow the uint64 shuffle
+    if not (
+        all(type(value) is int for value in (seed, count, offset))
+        and 0 <= seed < 2**32
+        and 0 <= offset <= count < 2**32
+        and (language is None or isinstance(language, str))
+    ):
+        raise ValueError("Invalid cursor")
+    return seed, count, offset, language
+
+
+def _mix64(values):
+    """splitmix64 finalizer of a uint64 array (arithmetic wraps around)"""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def _browse_positions(seed, count, positions):
+    """
+    Where `positions` of range(count) land in a seeded shuffle of it,
+    computed per position without materializing the permutation: a
+    balanced Feistel network on the smallest even-bit domain holding count,
+    re-applied ("cycle-walking") to values that fall outside range(count)
+    """
+    values = np.asarray(positions, dtype=np.uint64)
+    if len(values) == 0:
+        return values.astype(np.int64)
+    half_bits = max(1, ((count - 1).bit_length() + 1) // 2)
+    low_mask = np.uint64((1 << half_bits) - 1)
+    rounds = np.arange(BROWSE_ROUNDS, dtype=np.uint64)
+    keys = _mix64((np.uint64(seed) << np.uint64(8)) | rounds)
+
+    def permute(values):
+        left, right = values >> np.uint64(half_bits), values & low_mask
+        for key in keys:
+            left, right = right, left ^ (_mix64(right ^ key) & low_mask)
+        return (left << np.uint64(half_bits)) | right
+
+    values = permute(values)
+    outside = values >= count
+    while outside.any():
+        values[outside] = permute(values[outside])
+        outside = values >= count
+    return values.astype(np.int64)
 
 
 class MovieRecommender:
     def __init__(self):
+        self.startup_timings = {}  # Phase name -> seconds, reported at boot
+        self._starting = True
         self.movies = []
-        self.tfidf_matrix = None
-        self.vectorizer = None
+        self._tfidf = None  # TfidfIndex, see _prepare_tfidf
         self.api_key = self._load_api_key()
+        self.tmdb = TMDBClient(
+            self.api_key,
+            TMDB_BASE_URL,
+            cache=ResponseCache(TMDB_CACHE_FILE, retention=TMDB_CACHE_RETENTION),
+        )
         self.unique_movie_ids = set()  # To track unique movies
-        self._search_cache = {}  # Cache for search results
+        self._row_by_id = {}  # Movie id -> index into self.movies
+        self.store = DatasetStore(DATA_FILE, DATA_LOG_FILE, LEGACY_DATA_FILE)
+        self._unsaved = []  # Movies added or updated since the last checkpoint
+        self._checkpoint_lock = threading.Lock()
+        # Guards self.movies, its id/language lookups and self._unsaved, which
+        # the ingestion worker threads all write to
+        self._dataset_lock = threading.RLock()
+        self._search_cache = LRUCache(
+            maxsize=SEARCH_CACHE_SIZE,
+            ttl=SEARCH_CACHE_TTL,
+            max_bytes=SEARCH_CACHE_MAX_BYTES,
+            sizeof=_ranked_nbytes,
+        )
+        self._trailers = LRUCache(maxsize=TRAILER_CACHE_SIZE, ttl=TRAILER_TTL)
+        self._trailer_flights = SingleFlight()  # Coalesces lookups of one movie
+        self._details_flights = SingleFlight()  # One detail fetch per movie id
+        self.query_analyzer = QueryAnalyzer()
+        self.payloads = MoviePayloads()  # Pre-encoded JSON for API responses
+        self._rows_by_language = defaultdict(list)  # Browse/random pools
+
+        # Bumped whenever self.movies changes; derived indexes record the
+        # version they were built from so stale ones can be detected
+        self._dataset_version = 0
+        self._neighbors = None  # {"version", "tables": {language: (rows, scores)}}
+        self._ann = None  # {"version", "index"}, see _build_ann_index
+        self._rebuild_lock = threading.Lock()
+        self._rebuild_thread = None
+        self._genres_by_id = None  # See _genre_names
+        self._enrich_lock = threading.Lock()
+        self._enrich_thread = None  # See _start_enrichment
 
         # Load existing data or fetch new data
-        if os.path.exists(DATA_FILE):
-            self._load_data()
+        if self.store.exists():
+            with self._startup_phase("load_data"):
+                self._load_data()
             # If loaded data is less than target, fetch more
             if len(self.movies) < TARGET_MOVIE_COUNT:
                 print(
                     f"Only {len(self.movies)} movies in dataset, fetching more to reach {TARGET_MOVIE_COUNT}..."
                 )
-                self._fetch_additional_data()
+                with self._startup_phase("fetch_data"):
+                    self._fetch_additional_data()
         else:
-            self._fetch_and_process_data()
+            with self._startup_phase("fetch_data"):
+                self._fetch_and_process_data()
+
+        with self._startup_phase("payloads"):
+            self.payloads.warm(self.movies)
+
+        with self._startup_phase("index_build"):
+            self._prepare_tfidf()
+        # Neighbor table is built off the request path; recommendations fall
+        # back to exact scoring until it is ready
+        self._start_index_rebuild()
+        # List-level movies get their credits and keywords in the background
+        self._start_enrichment()
+
+        self._starting = False
+        print(
+            "Startup timings: "
+            + ", ".join(
+                f"{name} {secs:.2f}s" for name, secs in self.startup_timings.items()
+            )
+        )
 
-        self._prepare_tfidf()
+    @contextmanager
+    def _startup_phase(self, name):
+        """Time a block and add it to startup_timings while the instance boots"""
+        if not self._starting:
+            yield
+            return
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start_time
+            self.startup_timings[name] = self.startup_timings.get(name, 0.0) + elapsed
 
     def _load_api_key(self):
         """Load TMDB API key from a mounted file (Render Secret File)"""
@@ -86,234 +429,169 @@ class MovieRecommender:
             raise ValueError(f"API key file not found at {api_key_path}")
 
     def _load_data(self):
-        """Load movie data from JSON file"""
+        """Load movie data from the dataset store"""
         print("Loading existing movie data...")
+        self.movies = self.store.load()
+        # Populate the unique IDs set and the id -> row index
+        self.unique_movie_ids = set(movie["id"] for movie in self.movies)
+        self._row_by_id = {
+            movie["id"]: row for row, movie in enumerate(self.movies)
+        }
+        self._rows_by_language = defaultdict(list)
+        for row, movie in enumerate(self.movies):
+            self._rows_by_language[movie.get("language")].append(row)
+        print(f"Loaded {len(self.movies)} movies")
+
+    def _add_movie(self, movie):
+        """
+        Append a movie to the dataset, keeping the id lookups consistent.
+        Thread-safe; returns False without adding it if the id is already in
+        the dataset.
+        """
+        with self._dataset_lock:
+            if movie["id"] in self._row_by_id:
+                return False
+            self._row_by_id[movie["id"]] = len(self.movies)
+            self._rows_by_language[movie.get("language")].append(len(self.movies))
+            self.movies.append(movie)
+            self.unique_movie_ids.add(movie["id"])
+            self._unsaved.append(movie)
+            self._on_dataset_changed()
+            return True
+
+    def _on_dataset_changed(self):
+        """Mark derived indexes stale and refresh them if the index is live"""
+        self._dataset_version += 1
+        if self._tfidf is not None:
+            self._start_index_rebuild()
+
+    def row_of(self, movie_id):
+        """Return the row index of a movie id (int or numeric string), or None"""
         try:
-            with open(DATA_FILE, "r", encoding="utf-8") as f:
-                self.movies = json.load(f)
-            # Populate the unique IDs set
-            self.unique_movie_ids = set(movie["id"] for movie in self.movies)
-            print(f"Loaded {len(self.movies)} movies")
-        except json.JSONDecodeError:
-            print("Error parsing JSON file. Starting with empty dataset.")
-            self.movies = []
-            self.unique_movie_ids = set()
+            return self._row_by_id.get(int(movie_id))
+        except (TypeError, ValueError):
+            return None
+
+    def get_movie(self, movie_id):
+        """Return the movie dict for an id, or None if it is not in the dataset"""
+        row = self.row_of(movie_id)
+        return self.movies[row] if row is not None else None
 
     def _fetch_and_process_data(self):
         """Fetch a large dataset of movies from TMDB API using multiple methods"""
         print(f"Fetching {TARGET_MOVIE_COUNT} movies from TMDB API...")
+        crawl_started = datetime.now(timezone.utc)
         self.movies = []
         self.unique_movie_ids = set()
+        self._row_by_id = {}
+        self._rows_by_language = defaultdict(list)
 
         # Track progress
         start_time = time.time()
 
-        # Track movie counts by category
-        hollywood_count = 0
-        bollywood_count = 0
-
-        # 1. Fetch Hollywood movies first (popular movies)
-        print(f"Phase 1: Fetching Hollywood movies (target: {HOLLYWOOD_COUNT})...")
-
-        # 1.1 Fetch popular movies
-        self._fetch_from_endpoint("movie/popular", pages=50)
-        hollywood_count = len(self.unique_movie_ids)
-        self._save_progress("Popular Movies")
-
-        # 1.2 Fetch top-rated movies
-        self._fetch_from_endpoint("movie/top_rated", pages=50)
-        hollywood_count = len(self.unique_movie_ids)
-        self._save_progress("Top Rated Movies")
-
-        # 1.3 Fetch movies by year (recent years first)
-        current_year = datetime.now().year
-        years_to_fetch = list(
-            range(current_year, current_year - 50, -1)
-        )  # 50 years back
-
-        # Fetch in batches with threads
-        with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
-            futures = {
-                executor.submit(self._fetch_by_year, year, 5, True): year
-                for year in years_to_fetch
-            }
-            for future in futures:
-                future.result()  # Wait for completion
-                hollywood_count = len(self.unique_movie_ids)
-                self._save_progress(f"Year {futures[future]}")
-
-                if hollywood_count >= HOLLYWOOD_COUNT:
-                    break
-
-        # 1.4 Fetch movies by genre
-        genres = self._get_genres()
-
-        # Fetch in batches with threads
-        if hollywood_count < HOLLYWOOD_COUNT:
-            with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
-                futures = {
-                    executor.submit(
-                        self._fetch_by_genre, genre["id"], genre["name"], 10
-                    ): genre["name"]
-                    for genre in genres
-                }
-                for future in futures:
-                    future.result()  # Wait for completion
-                    hollywood_count = len(self.unique_movie_ids)
-                    self._save_progress(f"Genre {futures[future]}")
-
-                    if hollywood_count >= HOLLYWOOD_COUNT:
-                        break
-
-        # 1.5 Fetch by top studios if still needed
-        if hollywood_count < HOLLYWOOD_COUNT:
-            top_studios = [
-                420,  # Marvel Studios
-                2,  # Disney
-                33,  # Universal Pictures
-                4,  # Paramount
-                174,  # Warner Bros. Pictures
-                7505,  # Sony Pictures
-                25,  # 20th Century Fox
-                4171,  # Pixar
-                41,  # Dreamworks
-            ]
-
-            with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
-                futures = {
-                    executor.submit(self._fetch_by_company, studio_id, 10): studio_id
-                    for studio_id in top_studios
-                }
-                for future in futures:
-                    future.result()  # Wait for completion
-                    hollywood_count = len(self.unique_movie_ids)
-                    self._save_progress(f"Studio {futures[future]}")
-
-                    if hollywood_count >= HOLLYWOOD_COUNT:
-                        break
-
-        # 2. Fetch Bollywood movies (Hindi cinema)
-        print(f"Phase 2: Fetching Bollywood movies (target: {BOLLYWOOD_COUNT})...")
-        bollywood_start_count = len(self.unique_movie_ids)
-        bollywood_fetched = 0
-
-        # 2.1 Using discover endpoint with Hindi language parameter
-        max_pages = 100  # Increase pages to get more Bollywood content
-        page = 1
-        while bollywood_fetched < BOLLYWOOD_COUNT and page <= max_pages:
-            url = f"{TMDB_BASE_URL}/discover/movie?api_key={self.api_key}&with_original_language=hi&page={page}&sort_by=popularity.desc"
-            try:
-                response = requests.get(url)
-                if response.status_code == 200:
-                    data = response.json()
-                    results = data.get("results", [])
-                    if not results:
-                        break
-
-                    before_count = len(self.unique_movie_ids)
-                    self._process_movie_results(results, is_bollywood=True)
-                    after_count = len(self.unique_movie_ids)
-                    bollywood_fetched += after_count - before_count
-
-                    self._save_progress(f"Bollywood movies (page {page})")
-                    page += 1
-                    time.sleep(0.3)  # Slightly reduced sleep time
-
-                    # Break if we've reached end of results
-                    if page > data.get("total_pages", 1):
-                        break
-                else:
-                    print(
-                        f"Error {response.status_code} when fetching Bollywood movies"
-                    )
-                    time.sleep(1)
-            except Exception as e:
-                print(f"Exception while fetching Bollywood movies: {e}")
-                time.sleep(1)
-
-        print(f"Fetched {bollywood_fetched} Bollywood movies")
-
-        # 2.2 Fetch by popular Bollywood studios/production companies (optimized with parallel fetching)
-        if bollywood_fetched < BOLLYWOOD_COUNT:
-            bollywood_studios = [
-                1569,  # Yash Raj Films
-                2515,  # Dharma Productions
-                1913,  # Excel Entertainment
-                5626,  # Red Chillies Entertainment
-                1884,  # UTV Motion Pictures
-                3538,  # T-Series
-                7294,  # Viacom18 Studios
-                128250,  # Aamir Khan Productions
-                156782,  # Sanjay Leela Bhansali Productions
-                2043,  # Balaji Motion Pictures
-                10039,  # Nadiadwala Grandson Entertainment
-                12299,  # Reliance Entertainment
-                133990,  # Maddock Films
-                56369,  # Phantom Films
-                138377,  # Colour Yellow Productions
-            ]
-
-            with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
-                futures = {
-                    executor.submit(
-                        self._fetch_bollywood_by_studio, studio_id
-                    ): studio_id
-                    for studio_id in bollywood_studios
-                }
-                for future in futures:
-                    future.result()  # Wait for completion
-                    current_bollywood = len(self.unique_movie_ids) - hollywood_count
-                    self._save_progress(f"Bollywood studio {futures[future]}")
-
-                    if current_bollywood >= BOLLYWOOD_COUNT:
-                        break
+        # Sources are crawled by how many new movies they keep finding, and
+        # dropped once their category has reached its target
+        print(
+            f"Crawling Hollywood (target: {HOLLYWOOD_COUNT}) and "
+            f"Bollywood (target: {BOLLYWOOD_COUNT}) movies..."
+        )
+        counts = self._crawl(
+            self._initial_crawl_sources(),
+            {"hollywood": HOLLYWOOD_COUNT, "bollywood": BOLLYWOOD_COUNT},
+        )
 
         # Final save
-        with open(DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.movies, f, ensure_ascii=False, indent=2)
+        self._checkpoint(compact=True)
+        # Later refreshes only need changes made since this crawl began
+        self._write_last_sync(crawl_started)
 
         elapsed_time = (time.time() - start_time) / 60
 
         # Print summary
         print("\n=== FINAL SUMMARY ===")
         print(f"Total movies in dataset: {len(self.movies)}")
-        print(f"- Hollywood: {hollywood_count}")
-        print(f"- Bollywood: {len(self.unique_movie_ids) - hollywood_count}")
+        print(f"- Hollywood: {counts['hollywood']}")
+        print(f"- Bollywood: {counts['bollywood']}")
         print(f"Fetched and saved in {elapsed_time:.2f} minutes")
 
-    def _fetch_bollywood_by_studio(self, studio_id, max_pages=10):
-        """Fetch Bollywood movies from a specific studio"""
-        url = f"{TMDB_BASE_URL}/discover/movie?api_key={self.api_key}&with_companies={studio_id}&with_original_language=hi&page=1&sort_by=popularity.desc"
-        try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                total_pages = min(data.get("total_pages", 1), max_pages)
-
-                # Process first page results
-                self._process_movie_results(data.get("results", []), is_bollywood=True)
-
-                # Process remaining pages in parallel
-                if total_pages > 1:
-                    with ThreadPoolExecutor(
-                        max_workers=3
-                    ) as executor:  # Use fewer threads for nested operations
-                        for page in range(2, total_pages + 1):
-                            url = f"{TMDB_BASE_URL}/discover/movie?api_key={self.api_key}&with_companies={studio_id}&with_original_language=hi&page={page}&sort_by=popularity.desc"
-                            try:
-                                resp = requests.get(url)
-                                if resp.status_code == 200:
-                                    page_data = resp.json()
-                                    self._process_movie_results(
-                                        page_data.get("results", []), is_bollywood=True
-                                    )
-                                    time.sleep(0.3)
-                            except Exception as e:
-                                print(
-                                    f"Error on page {page} for studio {studio_id}: {e}"
-                                )
-        except Exception as e:
-            print(f"Error fetching from Bollywood studio {studio_id}: {e}")
+    def _initial_crawl_sources(self):
+        """
+        Crawl sources for building the dataset from scratch; sources with the
+        same expected yield are crawled in this order
+        """
+        # 1. Hollywood: popular and top-rated movies
+        yield CrawlSource("movie/popular", "hollywood", "movie/popular", pages=50)
+        yield CrawlSource("movie/top_rated", "hollywood", "movie/top_rated", pages=50)
+
+        # Movies by year (recent years first, 50 years back)
+        current_year = datetime.now().year
+        for year in range(current_year, current_year - 50, -1):
+            yield self._year_source(year, pages=5)
+
+        # Movies by genre
+        for genre in self._get_genres():
+            yield CrawlSource(
+                f"genre {genre['name']}",
+                "hollywood",
+                "discover/movie",
+                {"with_genres": genre["id"], "sort_by": "popularity.desc"},
+                pages=10,
+            )
+
+        # Top studios
+        top_studios = [
+            420,  # Marvel Studios
+            2,  # Disney
+            33,  # Universal Pictures
+            4,  # Paramount
+            174,  # Warner Bros. Pictures
+            7505,  # Sony Pictures
+            25,  # 20th Century Fox
+            4171,  # Pixar
+            41,  # Dreamworks
+        ]
+        for studio_id in top_studios:
+            yield CrawlSource(
+                f"studio {studio_id}",
+                "hollywood",
+                "discover/movie",
+                {"with_companies": studio_id, "sort_by": "popularity.desc"},
+                pages=10,
+            )
+
+        # 2. Bollywood: Hindi-language movies, then popular Bollywood studios
+        yield self._language_source("hi", pages=100)
+
+        bollywood_studios = [
+            1569,  # Yash Raj Films
+            2515,  # Dharma Productions
+            1913,  # Excel Entertainment
+            5626,  # Red Chillies Entertainment
+            1884,  # UTV Motion Pictures
+            3538,  # T-Series
+            7294,  # Viacom18 Studios
+            128250,  # Aamir Khan Productions
+            156782,  # Sanjay Leela Bhansali Productions
+            2043,  # Balaji Motion Pictures
+            10039,  # Nadiadwala Grandson Entertainment
+            12299,  # Reliance Entertainment
+            133990,  # Maddock Films
+            56369,  # Phantom Films
+            138377,  # Colour Yellow Productions
+        ]
+        for studio_id in bollywood_studios:
+            yield CrawlSource(
+                f"bollywood studio {studio_id}",
+                "bollywood",
+                "discover/movie",
+                {
+                    "with_companies": studio_id,
+                    "with_original_language": "hi",
+                    "sort_by": "popularity.desc",
+                },
+                pages=10,
+                language="hi",
+            )
 
     def _fetch_additional_data(self):
         """Fetch additional movies to reach the target count"""
@@ -321,20 +599,9 @@ class MovieRecommender:
         if current_count >= TARGET_MOVIE_COUNT:
             return
 
-        # How many more movies we need
-        needed = TARGET_MOVIE_COUNT - current_count
-
         # Count movies by category in current dataset
-        hollywood_count = 0
-        bollywood_count = 0
-
-        for movie in self.movies:
-            language = movie.get("language", "unknown")
-
-            if language == "hi":
-                bollywood_count += 1
-            else:
-                hollywood_count += 1
+        hollywood_count = self._category_count("hollywood")
+        bollywood_count = self._category_count("bollywood")
 
         print(f"\nCurrent counts:")
         print(f"- Hollywood: {hollywood_count}")
@@ -348,15 +615,13 @@ class MovieRecommender:
         print(f"- Hollywood: {need_hollywood}")
         print(f"- Bollywood: {need_bollywood}")
 
-        # First try to fetch more Bollywood movies if needed (typically harder to find)
+        sources = []
         if need_bollywood > 0:
-            print(f"Fetching {need_bollywood} more Bollywood movies...")
-
             # 1. Using Hindi language filter - more pages
             pages_to_fetch = min(100, need_bollywood // 20 + 5)
-            self._fetch_by_language("hi", max_pages=pages_to_fetch)
+            sources.append(self._language_source("hi", pages=pages_to_fetch))
 
-            # 2. Try actor-specific searches for popular Bollywood actors
+            # 2. Movies of popular Bollywood actors
             bollywood_actors = [
                 "Shah Rukh Khan",
                 "Amitabh Bachchan",
@@ -371,1175 +636,1838 @@ class MovieRecommender:
                 "Alia Bhatt",
                 "Katrina Kaif",
             ]
+            sources += [
+                self._person_source(actor, "bollywood", "hi")
+                for actor in bollywood_actors
+            ]
 
-            # Use the search endpoint to find movies by these actors
-            for actor in bollywood_actors:
-                if bollywood_count >= BOLLYWOOD_COUNT:
-                    break
-
-                self._fetch_by_person(actor, is_bollywood=True)
-
-                # Update count
-                bollywood_count = 0
-                for movie in self.movies:
-                    if movie.get("language") == "hi":
-                        bollywood_count += 1
-
-        # Then fetch more Hollywood movies if needed
         if need_hollywood > 0:
-            print(f"Fetching {need_hollywood} more Hollywood movies...")
-
-            # Try to fetch by years we might not have covered yet
+            # Years we might not have covered yet, randomized for variety and
+            # limited to 20 to prevent overloading
             years_to_try = list(range(1980, datetime.now().year))
-            random.shuffle(years_to_try)  # Randomize to get variety
-
-            # Use parallel fetching for efficiency
-            with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
-                futures = {}
-                for year in years_to_try[
-                    :20
-                ]:  # Limit to 20 years to prevent overloading
-                    futures[executor.submit(self._fetch_by_year, year, 3, True)] = year
-
-                for future in futures:
-                    future.result()  # Wait for completion
-
-                    # Update Hollywood count
-                    hollywood_count = 0
-                    for movie in self.movies:
-                        if movie.get("language") != "hi":
-                            hollywood_count += 1
-
-                    if hollywood_count >= HOLLYWOOD_COUNT:
-                        break
-
-            # If still need more, try popular English language directors
-            if hollywood_count < HOLLYWOOD_COUNT:
-                directors = [
-                    "Steven Spielberg",
-                    "Christopher Nolan",
-                    "Martin Scorsese",
-                    "Quentin Tarantino",
-                    "James Cameron",
-                    "Ridley Scott",
-                    "David Fincher",
-                    "Denis Villeneuve",
-                    "Wes Anderson",
-                ]
-
-                for director in directors:
-                    if hollywood_count >= HOLLYWOOD_COUNT:
-                        break
-
-                    self._fetch_by_person(director)
-
-                    # Update count
-                    hollywood_count = 0
-                    for movie in self.movies:
-                        if movie.get("language") != "hi":
-                            hollywood_count += 1
+            random.shuffle(years_to_try)
+            sources += [self._year_source(year, pages=3) for year in years_to_try[:20]]
+
+            # Then popular English language directors
+            directors = [
+                "Steven Spielberg",
+                "Christopher Nolan",
+                "Martin Scorsese",
+                "Quentin Tarantino",
+                "James Cameron",
+                "Ridley Scott",
+                "David Fincher",
+                "Denis Villeneuve",
+                "Wes Anderson",
+            ]
+            sources += [
+                self._person_source(director, "hollywood", "en")
+                for director in directors
+            ]
+
+        self._crawl(
+            sources, {"hollywood": HOLLYWOOD_COUNT, "bollywood": BOLLYWOOD_COUNT}
+        )
 
         # Save final dataset
-        with open(DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.movies, f, ensure_ascii=False, indent=2)
+        self._checkpoint(compact=True)
 
         print(f"Dataset updated to {len(self.movies)} movies")
 
-    def _fetch_by_person(self, person_name, is_bollywood=False):
-        """Fetch movies by a specific person (actor, director)"""
-        # First search for the person
-        search_url = (
-            f"{TMDB_BASE_URL}/search/person?api_key={self.api_key}&query={person_name}"
+    @staticmethod
+    def _year_source(year, pages):
+        """Popular movies released in one year"""
+        return CrawlSource(
+            f"year {year}",
+            "hollywood",
+            "discover/movie",
+            {
+                "primary_release_year": year,
+                "year": year,
+                "sort_by": "popularity.desc",
+            },
+            pages=pages,
+            year=year,
+        )
+
+    @staticmethod
+    def _language_source(language_code, pages):
+        """Popular movies in one original language (Hindi ones are Bollywood)"""
+        return CrawlSource(
+            f"language {language_code}",
+            "bollywood" if language_code == "hi" else "hollywood",
+            "discover/movie",
+            {"with_original_language": language_code, "sort_by": "popularity.desc"},
+            pages=pages,
+            language=language_code,
+        )
+
+    @staticmethod
+    def _person_source(person_name, category, language):
+        """Movies credited to a person (actor, director)"""
+        return CrawlSource(
+            f"person {person_name}",
+            category,
+            "search/person",
+            {"query": person_name},
+            language=language,
         )
-        try:
-            response = requests.get(search_url)
-            if response.status_code == 200:
-                data = response.json()
-                results = data.get("results", [])
-
-                if results:
-                    person_id = results[0]["id"]
-
-                    # Now get movies associated with this person
-                    credits_url = f"{TMDB_BASE_URL}/person/{person_id}/movie_credits?api_key={self.api_key}"
-                    credits_response = requests.get(credits_url)
-
-                    if credits_response.status_code == 200:
-                        credits_data = credits_response.json()
-                        movies = credits_data.get("cast", []) + credits_data.get(
-                            "crew", []
-                        )
-
-                        # If looking for Bollywood specifically, filter by language
-                        if is_bollywood:
-                            movie_ids = [movie["id"] for movie in movies]
-                            filtered_movies = []
-
-                            # Process in batches to avoid too many requests
-                            for i in range(0, len(movie_ids), BATCH_SIZE):
-                                batch = movie_ids[i : i + BATCH_SIZE]
-                                for movie_id in batch:
-                                    details = self._get_movie_details(movie_id)
-                                    if details and details.get("language") == "hi":
-                                        filtered_movies.append(details)
-                                        if details["id"] not in self.unique_movie_ids:
-                                            self.movies.append(details)
-                                            self.unique_movie_ids.add(details["id"])
-                        else:
-                            # For Hollywood, process all movies
-                            for movie in movies:
-                                if movie["id"] not in self.unique_movie_ids:
-                                    details = self._get_movie_details(movie["id"])
-                                    if (
-                                        details and details.get("language") != "hi"
-                                    ):  # Ensure it's not Hindi
-                                        self.movies.append(details)
-                                        self.unique_movie_ids.add(details["id"])
-
-                        print(f"Processed movies for {person_name}")
-        except Exception as e:
-            print(f"Error fetching movies for {person_name}: {e}")
 
     def _get_genres(self):
         """Get list of all available movie genres from TMDB"""
-        url = f"{TMDB_BASE_URL}/genre/movie/list?api_key={self.api_key}"
-        try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                return response.json().get("genres", [])
-            else:
-                print(f"Error {response.status_code} when fetching genres")
-                return []
-        except Exception as e:
-            print(f"Exception while fetching genres: {e}")
+        data = self.tmdb.get("genre/movie/list", max_age=GENRES_MAX_AGE)
+        if data is None:
             return []
+        return data.get("genres", [])
 
-    def _fetch_from_endpoint(self, endpoint, pages=10):
-        """Fetch movies from a specific TMDB endpoint using parallel requests"""
-        # Create page ranges to fetch in parallel
-        page_batches = [
-            list(range(i, min(i + MAX_THREADS, pages + 1)))
-            for i in range(1, pages + 1, MAX_THREADS)
-        ]
-
-        for batch in page_batches:
-            with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
-                futures = {
-                    executor.submit(self._fetch_single_page, endpoint, page): page
-                    for page in batch
-                }
-                for future in futures:
-                    future.result()  # Wait for completion
-
-    def _fetch_single_page(self, endpoint, page):
-        """Fetch a single page from an endpoint"""
-        url = f"{TMDB_BASE_URL}/{endpoint}?api_key={self.api_key}&page={page}"
-        try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                self._process_movie_results(data.get("results", []))
-                print(f"Fetched {endpoint} page {page}")
-                time.sleep(0.3)  # Reduced sleep time
-            else:
-                print(
-                    f"Error {response.status_code} when fetching {endpoint} page {page}"
-                )
-                time.sleep(1)
-        except Exception as e:
-            print(f"Exception while fetching {endpoint} page {page}: {e}")
-            time.sleep(1)
-
-    def _fetch_by_year(self, year, max_pages=5, strict_year=False):
-        """Fetch movies released in a specific year"""
-        for page in range(1, max_pages + 1):
-            # For strict year matching, use both primary_release_year and year parameters
-            if strict_year:
-                url = f"{TMDB_BASE_URL}/discover/movie?api_key={self.api_key}&primary_release_year={year}&year={year}&page={page}&sort_by=popularity.desc"
-            else:
-                url = f"{TMDB_BASE_URL}/discover/movie?api_key={self.api_key}&primary_release_year={year}&page={page}&sort_by=popularity.desc"
+    def _crawl(self, sources, quotas):
+        """
+        Crawl `sources` through a staged pipeline (see ingest_pipeline.py)
+        until every category in `quotas`, e.g. {"hollywood": 100,
+        "bollywood": 300}, has that many movies in the dataset or the
+        sources run out. List pages come from a CrawlFrontier, so sources
+        that keep turning up new movies are crawled first, and list results
+        are filtered by original language before anything else is fetched.
+        With TIERED_INGESTION the list results themselves are added as
+        list-level records (see _enrich_movies); otherwise their details are
+        fetched and normalized first. Movies are added by this thread alone.
+        Returns the final movie counts per category.
+        """
+        queued = set(self.unique_movie_ids)  # Ids already sent for details
+        queued_lock = threading.Lock()
+        backlog = [0]  # Ids sent for details and not fetched yet
+        written = [0]
+
+        def satisfied(category):
+            return self._category_count(category) >= quotas.get(category, 0)
+
+        def wanted(source, movie):
+            """Whether a list result is new and can still fill a quota"""
+            if not movie.get("id") or movie["id"] in queued:
+                return False
+            # Additional verification for strict year matching
+            if source.year is not None:
+                if not (movie.get("release_date") or "").startswith(str(source.year)):
+                    return False
+            language = movie.get("original_language")
+            if language is None:
+                return True  # Not reported by this list; the details decide
+            allowed = (source.language,) if source.language else CRAWL_LANGUAGES
+            return language in allowed and not satisfied(_category(language))
+
+        frontier = CrawlFrontier(
+            sources, wanted=lambda source: not satisfied(source.category)
+        )
 
+        def fetch_page(task):
+            source, page = task
+            results, total_pages, listings = [], None, []
             try:
-                response = requests.get(url)
-                if response.status_code == 200:
-                    data = response.json()
-                    results = data.get("results", [])
-
-                    # Additional verification for strict year matching
-                    if strict_year:
-                        filtered_results = []
-                        for movie in results:
-                            release_date = movie.get("release_date", "")
-                            if release_date and release_date.startswith(str(year)):
-                                filtered_results.append(movie)
-                        results = filtered_results
-
-                    self._process_movie_results(results)
-                    print(f"Fetched year {year} page {page}/{max_pages}")
-                    time.sleep(0.3)
-                else:
-                    print(
-                        f"Error {response.status_code} when fetching year {year} page {page}"
-                    )
-                    time.sleep(1)
-            except Exception as e:
-                print(f"Exception while fetching year {year} page {page}: {e}")
-                time.sleep(1)
-
-    def _fetch_by_genre(self, genre_id, genre_name, max_pages=5):
-        """Fetch movies by genre"""
-        for page in range(1, max_pages + 1):
-            url = f"{TMDB_BASE_URL}/discover/movie?api_key={self.api_key}&with_genres={genre_id}&page={page}&sort_by=popularity.desc"
+                if satisfied(source.category):
+                    return  # Queued before the quota was met
+                results, total_pages = self._crawl_page(source, page)
+                print(f"Fetched {source.label} page {page}")
+                with queued_lock:
+                    listings = [movie for movie in results if wanted(source, movie)]
+                    queued.update(movie["id"] for movie in listings)
+                    backlog[0] += len(listings)
+            finally:
+                frontier.record(source, page, len(results), len(listings), total_pages)
+            for listing in listings:
+                yield source, listing
+
+        def admit(source, movie):
+            """Yield a normalized movie if the source accepts its language"""
+            if movie is None:
+                return
+            if source.language and movie["language"] != source.language:
+                return
+            # Tag movies found through Bollywood sources
+            if source.language == "hi":
+                movie["document"] += BOLLYWOOD_TAGS
+            yield movie
+
+        def fetch_details(item):
+            source, listing = item
             try:
-                response = requests.get(url)
-                if response.status_code == 200:
-                    data = response.json()
-                    results = data.get("results", [])
-
-                    # Add genre tag for easier searching
-                    for movie in results:
-                        movie["genre_tag"] = genre_name.lower()
-
-                    self._process_movie_results(results)
-                    print(f"Fetched genre {genre_name} page {page}/{max_pages}")
-                    time.sleep(0.3)
-                else:
-                    print(
-                        f"Error {response.status_code} when fetching genre {genre_name} page {page}"
-                    )
-                    time.sleep(1)
-            except Exception as e:
-                print(f"Exception while fetching genre {genre_name} page {page}: {e}")
-                time.sleep(1)
-
-    def _fetch_by_language(self, language_code, max_pages=10):
-        """Fetch movies by original language"""
-        # Create page ranges to fetch in parallel for efficiency
-        page_batches = [
-            list(range(i, min(i + MAX_THREADS, max_pages + 1)))
-            for i in range(1, max_pages + 1, MAX_THREADS)
-        ]
+                data = None
+                if not satisfied(source.category):
+                    data = self._fetch_details_response(listing["id"])
+            finally:
+                with queued_lock:
+                    backlog[0] -= 1
+            if data is not None:
+                yield source, listing["id"], data
+
+        def normalize(item):
+            source, movie_id, data = item
+            yield from admit(source, self._movie_from_details(movie_id, data))
+
+        def from_listing(item):
+            source, listing = item
+            with queued_lock:
+                backlog[0] -= 1
+            yield from admit(source, self._movie_from_listing(listing))
+
+        def write(movie):
+            if satisfied(_category(movie["language"])) or not self._add_movie(movie):
+                return
+            written[0] += 1
+            if written[0] % CRAWL_CHECKPOINT_EVERY == 0:
+                self._save_progress(f"{written[0]} movies crawled")
+            if all(satisfied(category) for category in quotas):
+                pipeline.stop()  # Cancels every page and fetch still queued
+
+        if TIERED_INGESTION:
+            # List results are added as they are; the enricher fetches their
+            # details once the catalog is being served
+            stages = [
+                ("pages", fetch_page, CRAWL_PAGE_WORKERS),
+                ("listings", from_listing, 1),
+            ]
+        else:
+            stages = [
+                ("pages", fetch_page, CRAWL_PAGE_WORKERS),
+                ("details", fetch_details, CRAWL_DETAIL_WORKERS),
+                ("normalize", normalize, 1),
+            ]
+        pipeline = Pipeline(stages)
+        # List pages are only taken from the frontier while the next stage is
+        # running short of work, so they go to the best sources
+        tasks = frontier.tasks(
+            stopped=lambda: pipeline.stopped,
+            ready=lambda: backlog[0] < CRAWL_DETAIL_BACKLOG,
+        )
+        pipeline.run(tasks, write)
+        self._save_progress(f"{written[0]} movies crawled")
+        print(
+            f"Crawl went through {pipeline.processed['pages']} list pages and "
+            f"{pipeline.processed[stages[1][0]]} candidate movies"
+        )
+        return {category: self._category_count(category) for category in quotas}
 
-        for batch in page_batches:
-            with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
-                futures = {
-                    executor.submit(
-                        self._fetch_language_page, language_code, page
-                    ): page
-                    for page in batch
-                }
-                for future in futures:
-                    future.result()  # Wait for completion
-
-    def _fetch_language_page(self, language_code, page):
-        """Fetch a single page of language-specific results"""
-        url = f"{TMDB_BASE_URL}/discover/movie?api_key={self.api_key}&with_original_language={language_code}&page={page}&sort_by=popularity.desc"
-        try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                self._process_movie_results(
-                    data.get("results", []), is_bollywood=(language_code == "hi")
-                )
-                print(f"Fetched language {language_code} page {page}")
-                time.sleep(0.3)
-            else:
-                print(
-                    f"Error {response.status_code} when fetching language {language_code} page {page}"
-                )
-                time.sleep(1)
-        except Exception as e:
-            print(f"Exception while fetching language {language_code} page {page}: {e}")
-            time.sleep(1)
+    def _category_count(self, category):
+        """Movies in the dataset counting towards a crawl category, in O(1)"""
+        bollywood = len(self._rows_by_language.get("hi", ()))
+        return bollywood if category == "bollywood" else len(self.movies) - bollywood
 
-    def _fetch_by_company(self, company_id, max_pages=5):
-        """Fetch movies by production company"""
-        for page in range(1, max_pages + 1):
-            url = f"{TMDB_BASE_URL}/discover/movie?api_key={self.api_key}&with_companies={company_id}&page={page}&sort_by=popularity.desc"
-            try:
-                response = requests.get(url)
-                if response.status_code == 200:
-                    data = response.json()
-                    self._process_movie_results(data.get("results", []))
-                    print(f"Fetched company {company_id} page {page}/{max_pages}")
-                    time.sleep(0.3)
-                else:
-                    print(
-                        f"Error {response.status_code} when fetching company {company_id} page {page}"
-                    )
-                    time.sleep(1)
-            except Exception as e:
-                print(f"Exception while fetching company {company_id} page {page}: {e}")
-                time.sleep(1)
+    def _crawl_page(self, source, page):
+        """
+        Return (movies, total pages) for one page of a crawl source; the
+        page count is None if the page could not be fetched
+        """
+        if source.endpoint == "search/person":
+            return self._person_credits(source.params["query"]), 1
 
-    def _process_movie_results(self, results, is_bollywood=False):
-        """Process movie results and add to dataset if not already present"""
-        count = 0
+        data = self.tmdb.get(
+            source.endpoint, dict(source.params, page=page), max_age=LIST_MAX_AGE
+        )
+        if data is None:
+            return [], None
+        return data.get("results", []), data.get("total_pages", 1)
+
+    def _person_credits(self, person_name):
+        """Movies credited to the first person found for a name (cast and crew)"""
+        data = self.tmdb.get(
+            "search/person", {"query": person_name}, max_age=PERSON_MAX_AGE
+        )
+        if not data or not data.get("results"):
+            return []
+        person_id = data["results"][0]["id"]
 
-        # Process movies in batches for better efficiency
-        movie_batches = [
-            results[i : i + BATCH_SIZE] for i in range(0, len(results), BATCH_SIZE)
-        ]
+        credits_data = self.tmdb.get(
+            f"person/{person_id}/movie_credits", max_age=PERSON_MAX_AGE
+        )
+        if credits_data is None:
+            return []
+        return credits_data.get("cast", []) + credits_data.get("crew", [])
+
+    def _fetch_movie_details(self, movie_id, max_age=DETAILS_MAX_AGE):
+        """
+        Fetch and normalize a movie's details, accepting a response from the
+        on-disk cache if it is younger than max_age seconds
+        """
+        data = self._fetch_details_response(movie_id, max_age)
+        return self._movie_from_details(movie_id, data) if data is not None else None
 
-        for batch in movie_batches:
-            # Process each batch with parallel requests
-            movie_details_list = []
-            with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
-                movie_ids = [
-                    movie["id"]
-                    for movie in batch
-                    if movie.get("id") and movie["id"] not in self.unique_movie_ids
-                ]
-                futures = {
-                    executor.submit(
-                        self._get_movie_details, movie_id, is_bollywood
-                    ): movie_id
-                    for movie_id in movie_ids
-                }
-
-                for future in futures:
-                    movie_details = future.result()
-                    if movie_details:
-                        movie_details_list.append(movie_details)
-
-            # Add valid movies to our dataset
-            for movie_details in movie_details_list:
-                # Add specific tags based on movie type
-                if is_bollywood:
-                    movie_details["document"] += " bollywood hindi indian"
-
-                self.movies.append(movie_details)
-                self.unique_movie_ids.add(movie_details["id"])
-                count += 1
-
-        if count > 0:
-            print(f"Added {count} new movies from batch")
-
-    @lru_cache(maxsize=CACHE_SIZE)
-    def _get_movie_details(self, movie_id, prefer_hindi=False):
-        """Get detailed information about a specific movie with caching"""
-        url = f"{TMDB_BASE_URL}/movie/{movie_id}?api_key={self.api_key}&append_to_response=credits,keywords"
+    def _fetch_details_response(self, movie_id, max_age=DETAILS_MAX_AGE):
+        """
+        Raw TMDB details of a movie with its appended responses, or None.
+        Concurrent fetches of the same movie (a title listed by several crawl
+        sources, or refreshed while the crawl reaches it) share one request.
+        """
+        return self._details_flights.do(
+            (movie_id, max_age),
+            partial(
+                self.tmdb.get,
+                f"movie/{movie_id}",
+                {"append_to_response": DETAILS_APPEND},
+                max_age=max_age,
+            ),
+        )
+
+    def _movie_from_details(self, movie_id, data):
+        """
+        Normalize a TMDB details response into a movie record, or None for
+        movies outside the dataset's languages
+        """
         try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-
-                # Basic movie information
-                title = data.get("title", "")
-                original_title = data.get("original_title", "")
-                overview = data.get("overview", "")
-                release_date = data.get("release_date", "")
-
-                # Language handling - for Bollywood preferences
-                original_language = data.get("original_language", "")
-                if prefer_hindi and original_language != "hi":
-                    return None
-
-                # For our dataset, we only want English (Hollywood) or Hindi (Bollywood) movies
-                if original_language not in ["en", "hi"]:
-                    return None
-
-                # Get genres, cast, crew
-                genres = [genre["name"] for genre in data.get("genres", [])]
-
-                # Get director and top cast
-                director = ""
-                cast = []
-
-                credits = data.get("credits", {})
-                crew = credits.get("crew", [])
-                actors = credits.get("cast", [])
-
-                for person in crew:
-                    job = person.get("job", "").lower().strip()
-                    if job == "director":
-                        director = person.get("name", "").strip()
-                        break
-
-                for actor in actors[:10]:  # Get top 10 cast
-                    if actor.get("name"):
-                        cast.append(actor.get("name"))
-
-                # Get keywords/tags
-                keywords = []
-                if "keywords" in data and "keywords" in data["keywords"]:
-                    keywords = [kw["name"] for kw in data["keywords"]["keywords"]]
-
-                # Create a comprehensive document for text search
-                document = f"{title} {original_title} {overview} {' '.join(genres)} {director} {' '.join(cast)} {' '.join(keywords)}"
-
-                # Prepare and return the structured movie data
-                movie_info = {
-                    "id": movie_id,
-                    "title": title,
-                    "original_title": original_title,
-                    "overview": overview,
-                    "release_date": release_date,
-                    "genres": genres,
-                    "director": director,
-                    "cast": cast,
-                    "keywords": keywords,
-                    "language": original_language,
-                    "document": document,
-                    "poster_path": data.get("poster_path", None),
-                    "vote_average": data.get("vote_average"),
-                    "runtime": data.get("runtime"),
-                }
-
-                return movie_info
-            else:
-                print(f"Error {response.status_code} when fetching movie {movie_id}")
+            # Basic movie information
+            title = data.get("title", "")
+            original_title = data.get("original_title", "")
+            overview = data.get("overview", "")
+            release_date = data.get("release_date", "")
+
+            original_language = data.get("original_language", "")
+
+            # For our dataset, we only want English (Hollywood) or Hindi (Bollywood) movies
+            if original_language not in CRAWL_LANGUAGES:
                 return None
-        except Exception as e:
-            print(f"Exception while fetching movie {movie_id}: {e}")
-            return None
 
-    def _save_progress(self, phase_name):
-        """Save intermediate progress to the data file"""
-        if len(self.movies) % 100 == 0:  # Save every 100 movies
-            print(
-                f"Progress update ({phase_name}): {len(self.movies)} movies in dataset"
-            )
-            with open(DATA_FILE, "w", encoding="utf-8") as f:
-                json.dump(self.movies, f, ensure_ascii=False, indent=2)
+            # Get genres, cast, crew
+            genres = [genre["name"] for genre in data.get("genres", [])]
 
-    def _prepare_tfidf(self):
-        """Prepare the TF-IDF matrix for recommendation"""
-        print("Preparing TF-IDF vectorizer...")
-        stop_words = set(stopwords.words("english"))
-        lemmatizer = WordNetLemmatizer()
-
-        # Preprocess the documents for more effective recommendations
-        preprocessed_docs = []
-        for movie in self.movies:
-            doc = movie.get("document", "")
-
-            # Tokenize and preprocess
-            tokens = word_tokenize(doc.lower())
-            tokens = [
-                lemmatizer.lemmatize(token)
-                for token in tokens
-                if token.isalpha() and token not in stop_words
-            ]
+            # Get director and top cast
+            director = ""
+            cast = []
 
-            preprocessed_docs.append(" ".join(tokens))
+            credits = data.get("credits", {})
+            crew = credits.get("crew", [])
+            actors = credits.get("cast", [])
 
-        # Create TF-IDF matrix
-        self.vectorizer = TfidfVectorizer(
-            max_features=4000
-        )  # Limit features for memory efficiency
-        self.tfidf_matrix = self.vectorizer.fit_transform(preprocessed_docs)
-        print(f"TF-IDF matrix shape: {self.tfidf_matrix.shape}")
+            for person in crew:
+                job = person.get("job", "").lower().strip()
+                if job == "director":
+                    director = person.get("name", "").strip()
+                    break
+
+            for actor in actors[:10]:  # Get top 10 cast
+                if actor.get("name"):
+                    cast.append(actor.get("name"))
+
+            # Get keywords/tags
+            keywords = []
+            if "keywords" in data and "keywords" in data["keywords"]:
+                keywords = [kw["name"] for kw in data["keywords"]["keywords"]]
+
+            # Create a comprehensive document for text search
+            document = f"{title} {original_title} {overview} {' '.join(genres)} {director} {' '.join(cast)} {' '.join(keywords)}"
+
+            # Prepare and return the structured movie data
+            movie_info = {
+                "id": movie_id,
+                "title": title,
+                "original_title": original_title,
+                "overview": overview,
+                "release_date": release_date,
+                "genres": genres,
+                "director": director,
+                "cast": cast,
+                "keywords": keywords,
+                "language": original_language,
+                "document": document,
+                "poster_path": data.get("poster_path", None),
+                "vote_average": data.get("vote_average"),
+                "runtime": data.get("runtime"),
+            }
+            if FETCH_TRAILERS:
+                movie_info["trailer_key"] = _trailer_key(data.get("videos", {}))
+
+            return movie_info
+        except Exception as e:
+            print(f"Exception while processing movie {movie_id}: {e}")
+            return None
 
-    def search_movies(self, query, limit=10, language=None):
+    def _movie_from_listing(self, listing):
         """
-        Enhanced search with genre, mood, and common term understanding
+        List-level movie record from a list or discover result, or None if its
+        language is not one the dataset keeps. It is searchable right away;
+        _enrich_movies later replaces it with the full record.
         """
-        if not query:
-            return self._get_random_recommendations(limit, language)
+        original_language = listing.get("original_language")
+        if original_language not in CRAWL_LANGUAGES:
+            return None
 
-        # Extract genre, mood, and other search patterns
-        genre_match = self._extract_genre(query)
-        mood_match = self._extract_mood(query)
-        actor_match = self._extract_actor(query)
-        decade_match = self._extract_decade(query)
+        title = listing.get("title", "")
+        original_title = listing.get("original_title", "")
+        overview = listing.get("overview", "")
+        genre_names = self._genre_names()
+        genres = [
+            genre_names[genre_id]
+            for genre_id in listing.get("genre_ids", [])
+            if genre_id in genre_names
+        ]
 
-        # Log what was detected (for debugging)
-        detections = []
-        if genre_match:
-            detections.append(f"Genre: {genre_match}")
-        if mood_match:
-            detections.append(f"Mood: {mood_match}")
-        if actor_match:
-            detections.append(f"Actor: {actor_match}")
-        if decade_match:
-            detections.append(f"Decade: {decade_match}")
+        return {
+            "id": listing["id"],
+            "title": title,
+            "original_title": original_title,
+            "overview": overview,
+            "release_date": listing.get("release_date", ""),
+            "genres": genres,
+            "director": "",
+            "cast": [],
+            "keywords": [],
+            "language": original_language,
+            "document": f"{title} {original_title} {overview} {' '.join(genres)}",
+            "poster_path": listing.get("poster_path", None),
+            "vote_average": listing.get("vote_average"),
+            "runtime": None,
+            "enriched": False,  # Credits and keywords not fetched yet
+        }
 
-        if detections:
-            print(f"Search query '{query}' detected: {', '.join(detections)}")
-
-        # Apply spelling correction
-        corrected_query = self._correct_movie_terms(query)
-        if corrected_query != query:
-            print(f"Corrected query: '{query}' to '{corrected_query}'")
-            query = corrected_query
-
-        # Expand query with synonyms and additional terms
-        expanded_query = self._expand_query(query)
-
-        # Clean common prefixes like "show me", "recommend", etc.
-        cleaned_query = self._clean_search_prefixes(expanded_query)
-
-        # Process the query with NLTK
-        stop_words = set(stopwords.words("english"))
-        lemmatizer = WordNetLemmatizer()
-
-        # Clean and tokenize the query
-        cleaned_query = re.sub(r"[^\w\s]", "", cleaned_query.lower())
-        tokens = word_tokenize(cleaned_query)
-        processed_tokens = [
-            lemmatizer.lemmatize(token)
-            for token in tokens
-            if token.isalpha() and token not in stop_words
-        ]
-        processed_query = " ".join(processed_tokens)
+    def _genre_names(self):
+        """TMDB genre id -> name, fetched once"""
+        if self._genres_by_id is None:
+            self._genres_by_id = {
+                genre["id"]: genre["name"] for genre in self._get_genres()
+            }
+        return self._genres_by_id
+
+    def _start_enrichment(self):
+        """Enrich list-level movies in a background thread (one at a time)"""
+        with self._enrich_lock:
+            if self._enrich_thread is not None:
+                return
+            self._enrich_thread = threading.Thread(
+                target=self._enrich_loop, daemon=True
+            )
+            self._enrich_thread.start()
 
-        # Transform query to the same vector space
-        query_vector = self.vectorizer.transform([processed_query])
+    def _enrich_loop(self):
+        """Thread body of _start_enrichment"""
+        try:
+            self._enrich_movies()
+        except Exception as e:
+            print(f"Error enriching movies: {e}")
+        finally:
+            with self._enrich_lock:
+                self._enrich_thread = None
 
-        # Calculate similarity with all movies
-        sim_scores = cosine_similarity(query_vector, self.tfidf_matrix).flatten()
+    def _enrich_movies(self):
+        """
+        Fetch the details of every list-level movie through a pipeline and
+        replace the records in batches of ENRICH_BATCH. The index is rebuilt
+        at most every ENRICH_REINDEX_INTERVAL seconds and once at the end,
+        not per batch, so neither the refit nor the search cache it clears
+        tracks the batch rate. Movies whose details cannot be fetched stay
+        list-level until the next run. Returns the number of movies enriched.
+        """
+        with self._dataset_lock:
+            movie_ids = [
+                movie["id"] for movie in self.movies if not movie.get("enriched", True)
+            ]
+        if not movie_ids:
+            return 0
+        print(f"Enriching {len(movie_ids)} list-level movies in the background...")
+        batch = []
+        enriched = 0
+        reindexed_at = time.monotonic()
+        stale = False  # Enriched records the index does not reflect yet
+
+        def fetch_details(movie_id):
+            data = self._fetch_details_response(movie_id)
+            if data is not None:
+                yield movie_id, data
+
+        def normalize(item):
+            movie = self._movie_from_details(*item)
+            if movie is not None:
+                yield movie
+
+        def apply():
+            nonlocal enriched, reindexed_at, stale
+            for details in batch:
+                old = self.get_movie(details["id"])
+                # Carry over the tags added when the movie was first ingested
+                if old and old.get("document", "").endswith(BOLLYWOOD_TAGS):
+                    details["document"] += BOLLYWOOD_TAGS
+            self._upsert_movies(batch, reindex=False)
+            self._checkpoint()
+            enriched += len(batch)
+            print(f"Enriched {enriched}/{len(movie_ids)} movies")
+            batch.clear()
+            stale = True
+            if time.monotonic() - reindexed_at >= ENRICH_REINDEX_INTERVAL:
+                self._on_dataset_changed()
+                reindexed_at, stale = time.monotonic(), False
+
+        def write(movie):
+            batch.append(movie)
+            if len(batch) >= ENRICH_BATCH:
+                apply()
+
+        Pipeline(
+            [
+                ("details", fetch_details, CRAWL_DETAIL_WORKERS),
+                ("normalize", normalize, 1),
+            ]
+        ).run(movie_ids, write)
+        if batch:
+            apply()
+        if stale:
+            self._on_dataset_changed()
+        return enriched
+
+    def _upsert_movie(self, movie):
+        """Replace a movie already in the dataset, or add it if it is new"""
+        self._upsert_movies([movie])
+
+    def _upsert_movies(self, movies, reindex=True):
+        """
+        Replace or add several movies, marking the derived indexes stale once
+        so the batch costs a single index rebuild. With reindex=False replaced
+        records are not marked; the caller calls _on_dataset_changed later.
+        """
+        with self._dataset_lock:
+            replaced = False
+            for movie in movies:
+                row = self._row_by_id.get(movie["id"])
+                if row is None:
+                    self._add_movie(movie)
+                    continue
+                old_language = self.movies[row].get("language")
+                if movie.get("language") != old_language:
+                    # Keep the language pools (and so the category counts) exact
+                    self._rows_by_language[old_language].remove(row)
+                    bisect.insort(self._rows_by_language[movie.get("language")], row)
+                self.movies[row] = movie
+                self._unsaved.append(movie)
+                replaced = True
+            if replaced and reindex:
+                self._on_dataset_changed()
+
+    def _read_last_sync(self):
+        """Return the (UTC) datetime of the last change-feed sync, or None"""
+        try:
+            with open(SYNC_STATE_FILE, "r", encoding="utf-8") as f:
+                synced_at = datetime.fromisoformat(json.load(f)["last_sync"])
+        except (OSError, ValueError, KeyError):
+            return None
+        # Older sync states were written as naive UTC times
+        if synced_at.tzinfo is None:
+            synced_at = synced_at.replace(tzinfo=timezone.utc)
+        return synced_at
+
+    def _read_pending_refresh(self):
+        """Ids of changed movies whose refetch failed at the last sync"""
+        try:
+            with open(SYNC_STATE_FILE, "r", encoding="utf-8") as f:
+                pending = json.load(f).get("pending", [])
+        except (OSError, ValueError, AttributeError):
+            return []
+        return [movie_id for movie_id in pending if isinstance(movie_id, int)]
 
-        # Apply boosting based on detected patterns
-        sim_scores = self._boost_scores_by_patterns(
-            sim_scores, genre_match, mood_match, actor_match, decade_match
+    def _write_last_sync(self, synced_at, pending=()):
+        """
+        Persist the time up to which TMDB changes have been applied, and the
+        ids of changed movies still to be refetched (see refresh)
+        """
+        tmp_path = f"{SYNC_STATE_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"last_sync": synced_at.isoformat(), "pending": sorted(pending)}, f
+            )
+        os.replace(tmp_path, SYNC_STATE_FILE)
+
+    def _changed_movie_ids(self, start, end):
+        """Ids from TMDB's movie change feed between two datetimes"""
+        changed = set()
+        window_start = start
+        while window_start < end:
+            window_end = min(window_start + timedelta(days=CHANGES_WINDOW_DAYS), end)
+            page, total_pages = 1, 1
+            while page <= total_pages:
+                data = self.tmdb.get(
+                    "movie/changes",
+                    {
+                        "start_date": window_start.strftime("%Y-%m-%d"),
+                        "end_date": window_end.strftime("%Y-%m-%d"),
+                        "page": page,
+                    },
+                    max_age=0,
+                )
+                if data is None:
+                    raise RuntimeError("could not read the TMDB change feed")
+                changed.update(item["id"] for item in data.get("results", []))
+                total_pages = data.get("total_pages", 1)
+                page += 1
+            window_start = window_end
+        return changed
+
+    def refresh_changed_movies(self):
+        """
+        Re-fetch only the movies in our dataset that TMDB reports as changed
+        since the last sync, and upsert them. Movies whose refetch fails are
+        recorded with the sync time and retried by the next refresh, since
+        the change feed will not list them again. Returns the number
+        refreshed.
+        """
+        sync_started = datetime.now(timezone.utc)
+        # Without a recorded sync, look back as far as one change-feed window
+        since = self._read_last_sync() or sync_started - timedelta(
+            days=CHANGES_WINDOW_DAYS
         )
 
-        # Get movie indices with highest similarity
-        movie_indices = sim_scores.argsort()[::-1]
+        try:
+            changed = self._changed_movie_ids(since, sync_started)
+        except RuntimeError as e:
+            print(f"Refresh aborted: {e}")
+            return 0
+
+        movie_ids = [movie_id for movie_id in changed if movie_id in self._row_by_id]
+        print(
+            f"TMDB reports {len(changed)} changed movies since {since:%Y-%m-%d}, "
+            f"{len(movie_ids)} of them in our dataset"
+        )
+        listed = set(movie_ids)
+        retries = [
+            movie_id
+            for movie_id in self._read_pending_refresh()
+            if movie_id in self._row_by_id and movie_id not in listed
+        ]
+        if retries:
+            print(f"Retrying {len(retries)} movies whose last refetch failed")
+        movie_ids += retries
 
-        # Apply language filter if specified
-        results = []
-        count = 0
+        refreshed = 0
+        failed = []
+        with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
+            # max_age=0: the cached copies are exactly what changed
+            fetch = partial(self._fetch_details_response, max_age=0)
+            for movie_id, data in zip(movie_ids, executor.map(fetch, movie_ids)):
+                if data is None:
+                    # Keep the stored copy and retry at the next refresh
+                    failed.append(movie_id)
+                    continue
+                details = self._movie_from_details(movie_id, data)
+                if not details:
+                    continue
+                old = self.get_movie(details["id"])
+                # Carry over the tags added when the movie was first ingested
+                if old.get("document", "").endswith(BOLLYWOOD_TAGS):
+                    details["document"] += BOLLYWOOD_TAGS
+                self._upsert_movie(details)
+                refreshed += 1
+
+        self._checkpoint()
+        self._write_last_sync(sync_started, failed)
+        self.tmdb.cache.prune(TMDB_CACHE_RETENTION)
+        if failed:
+            print(f"Could not refetch {len(failed)} movies; they are retried next time")
+        print(f"Refreshed {refreshed} movies")
+        return refreshed
+
+    def start_periodic_refresh(self, interval_hours):
+        """Run refresh_changed_movies every `interval_hours` in the background"""
+
+        def loop():
+            while True:
+                time.sleep(interval_hours * 3600)
+                try:
+                    self.refresh_changed_movies()
+                except Exception as e:
+                    print(f"Error during periodic refresh: {e}")
 
-        for idx in movie_indices:
-            movie = self.movies[idx]
-            # Apply language filter if specified
-            if language and movie.get("language") != language:
-                continue
+        threading.Thread(target=loop, daemon=True).start()
 
-            # Add similarity score to movie data
-            movie_with_score = movie.copy()
-            movie_with_score["similarity"] = float(sim_scores[idx])
+    def _save_progress(self, phase_name):
+        """Checkpoint movies added since the last save to the dataset store"""
+        if self._unsaved:
+            print(
+                f"Progress update ({phase_name}): {len(self.movies)} movies in dataset"
+            )
+        self._checkpoint()
 
-            results.append(movie_with_score)
-            count += 1
+    def _checkpoint(self, compact=False):
+        """Append unsaved movies to the store's log, compacting when it is due"""
+        with self._checkpoint_lock:
+            with self._dataset_lock:
+                unsaved, self._unsaved = self._unsaved, []
+            try:
+                self.store.append(unsaved)
+                if compact or self.store.should_compact():
+                    with self._dataset_lock:
+                        movies = self.movies[:]
+                    self.store.compact(movies)
+            except OSError as e:
+                # Keep the records so the next checkpoint retries them
+                with self._dataset_lock:
+                    self._unsaved = unsaved + self._unsaved
+                print(f"Error saving dataset: {e}")
 
-            if count >= limit:
-                break
+    def _prepare_tfidf(self):
+        """Prepare the TF-IDF matrix for recommendation; returns the new index"""
+        print("Preparing TF-IDF vectorizer...")
+        with self._dataset_lock:
+            version, movies = self._dataset_version, self.movies[:]
+
+        # Reuse the on-disk snapshot when the indexed documents and their
+        # preprocessing are unchanged
+        fingerprint = fingerprint_documents(movies, PREPROCESS_VERSION)
+        snapshot = load_snapshot(INDEX_SNAPSHOT_DIR, fingerprint, TFIDF_MAX_FEATURES)
+        if snapshot is not None:
+            print("Loaded TF-IDF index snapshot")
+            vectorizer, tfidf_matrix = snapshot
+        else:
+            preprocessed_docs = self._preprocess_documents(movies)
 
-        return results
+            # Create TF-IDF matrix
+            vectorizer = TfidfVectorizer(
+                max_features=TFIDF_MAX_FEATURES
+            )  # Limit features for memory efficiency
+            tfidf_matrix = vectorizer.fit_transform(preprocessed_docs)
 
-    def _boost_scores_by_patterns(
-        self, scores, genre=None, mood=None, actor=None, decade=None
-    ):
-        """Boost similarity scores based on detected patterns"""
-        boosted_scores = scores.copy()
-
-        for idx, movie in enumerate(self.movies):
-            boost_factor = 1.0
-
-            # Boost by genre
-            if genre and genre.lower() in [g.lower() for g in movie.get("genres", [])]:
-                boost_factor += 0.5
-
-            # Boost by mood (check for mood terms in overview and keywords)
-            if mood:
-                movie_text = " ".join(
-                    [movie.get("overview", ""), " ".join(movie.get("keywords", []))]
-                ).lower()
-
-                # Check if the mood appears in movie text
-                if mood.lower() in movie_text:
-                    boost_factor += 0.3
-
-                # Check keywords associated with the mood
-                mood_keywords = self._get_mood_keywords(mood)
-                for keyword in mood_keywords:
-                    if keyword in movie_text:
-                        boost_factor += 0.1
-                        break
-
-            # Boost by actor
-            if actor and actor.lower() in [
-                cast.lower() for cast in movie.get("cast", [])
-            ]:
-                boost_factor += 0.4
-
-            # Boost by decade
-            if decade and movie.get("release_date", ""):
-                try:
-                    year = int(movie["release_date"].split("-")[0])
-                    if (year // 10) * 10 == decade:
-                        boost_factor += 0.3
-                except (ValueError, IndexError):
-                    pass
+            try:
+                save_snapshot(
+                    INDEX_SNAPSHOT_DIR,
+                    fingerprint,
+                    vectorizer,
+                    tfidf_matrix,
+                    PREPROCESS_VERSION,
+                )
+                # Serve from the memory-mapped copy, shared with other workers
+                vectorizer, tfidf_matrix = load_snapshot(
+                    INDEX_SNAPSHOT_DIR, fingerprint, TFIDF_MAX_FEATURES
+                ) or (vectorizer, tfidf_matrix)
+            except OSError as e:
+                print(f"Could not save TF-IDF index snapshot: {e}")
+
+        features_key = f"v{FEATURES_VERSION}:" + fingerprint_records(
+            movies, FEATURE_FIELDS
+        )
+        features = self._load_shared_features(fingerprint, features_key)
+        if features is None:
+            features = self._build_feature_columns(movies)
+            features = self._share_features(fingerprint, features_key, features)
+
+        partitions = self._load_shared_partitions(fingerprint, features_key)
+        if partitions is None:
+            partitions = self._build_partitions(tfidf_matrix, features)
+            partitions = self._share_partitions(fingerprint, features_key, partitions)
+
+        tfidf = TfidfIndex(
+            vectorizer,
+            tfidf_matrix,
+            features,
+            partitions,
+            version,
+            (fingerprint, features_key),
+        )
+        self._tfidf = tfidf
+        # Cached results were ranked against the previous index
+        self._search_cache.clear()
+        print(f"TF-IDF matrix shape: {tfidf_matrix.shape}")
+        return tfidf
+
+    @property
+    def vectorizer(self):
+        """Fitted vectorizer of the live index (None before the first build)"""
+        return self._tfidf.vectorizer if self._tfidf is not None else None
+
+    @property
+    def tfidf_matrix(self):
+        """TF-IDF matrix of the live index (None before the first build)"""
+        return self._tfidf.matrix if self._tfidf is not None else None
+
+    def _preprocess_documents(self, movies):
+        """Tokenize, drop stopwords and lemmatize every movie's document"""
+        with self._startup_phase("nltk_resources"):
+            ensure_nltk_resources()
+
+        # Only documents that changed since the last build are reprocessed
+        return preprocess_documents(
+            [movie.get("document", "") for movie in movies],
+            cache_path=PREPROCESS_CACHE_FILE,
+        )
 
-            # Apply boost
-            boosted_scores[idx] *= boost_factor
+    def _build_feature_columns(self, movies):
+        """
+        Precompute the per-movie columns used by _pattern_boost so
+        boosting a query is a handful of vector operations
+        """
+        n = len(movies)
+
+        # Genre membership as a movies x genres boolean matrix
+        genre_columns = {}
+        genre_hits = []
+        for row, movie in enumerate(movies):
+            for genre in movie.get("genres", []):
+                col = genre_columns.setdefault(genre.lower(), len(genre_columns))
+                genre_hits.append((row, col))
+        genre_matrix = np.zeros((n, len(genre_columns)), dtype=bool)
+        if genre_hits:
+            hit_rows, hit_cols = zip(*genre_hits)
+            genre_matrix[list(hit_rows), list(hit_cols)] = True
+
+        languages = np.array([movie.get("language", "") for movie in movies])
+
+        # Release year (0 when unknown)
+        release_years = np.zeros(n, dtype=np.int16)
+        for row, movie in enumerate(movies):
+            try:
+                release_date = movie.get("release_date") or ""
+                release_years[row] = int(release_date.split("-")[0])
+            except (ValueError, IndexError):
+                pass
+
+        # Cast member -> rows they appear in
+        person_rows = defaultdict(list)
+        for row, movie in enumerate(movies):
+            for name in set(cast.lower() for cast in movie.get("cast", [])):
+                person_rows[name].append(row)
+        person_rows = {
+            name: np.array(rows, dtype=np.int32) for name, rows in person_rows.items()
+        }
 
-        return boosted_scores
+        # Mood boost per movie: +0.3 if the mood word itself appears in the
+        # overview/keywords, +0.1 if any of its associated keywords does
+        mood_affinity = np.zeros((n, len(MOOD_COLUMNS)), dtype=np.float32)
+        for row, movie in enumerate(movies):
+            movie_text = " ".join(
+                [movie.get("overview", ""), " ".join(movie.get("keywords", []))]
+            ).lower()
+            for mood, col in MOOD_COLUMNS.items():
+                if mood in movie_text:
+                    mood_affinity[row, col] += 0.3
+                if any(keyword in movie_text for keyword in MOOD_KEYWORDS[mood]):
+                    mood_affinity[row, col] += 0.1
+
+        return {
+            "genre_columns": genre_columns,
+            "genre_matrix": genre_matrix,
+            "release_years": release_years,
+            "person_rows": person_rows,
+            "mood_affinity": mood_affinity,
+            "language_masks": {
+                language: languages == language for language in np.unique(languages)
+            },
+        }
 
-    def _extract_genre(self, query):
-        """Extract genre information from the query"""
-        # List of common genres
-        genres = [
-            "action",
-            "adventure",
-            "animation",
-            "comedy",
-            "crime",
-            "documentary",
-            "drama",
-            "family",
-            "fantasy",
-            "history",
-            "horror",
-            "music",
-            "mystery",
-            "romance",
-            "science fiction",
-            "sci-fi",
-            "thriller",
-            "war",
-            "western",
-        ]
+    def _share_features(self, fingerprint, features_key, features):
+        """
+        Publish feature columns to the index snapshot so other worker
+        processes map them instead of building their own copy. Returns the
+        memory-mapped columns, or `features` if they could not be saved.
+        """
+        people = list(features["person_rows"])
+        person_rows = [features["person_rows"][name] for name in people]
+        languages = list(features["language_masks"])
+        n = len(features["release_years"])
+        arrays = {
+            "genre_matrix": features["genre_matrix"],
+            "release_years": features["release_years"],
+            "mood_affinity": features["mood_affinity"],
+            "person_offsets": np.cumsum([0] + [len(rows) for rows in person_rows]),
+            "person_row_ids": np.concatenate(person_rows or [np.zeros(0, np.int32)]),
+            "language_masks": np.array(
+                [features["language_masks"][language] for language in languages],
+                dtype=bool,
+            ).reshape(len(languages), n),
+        }
+        meta = {
+            "genre_columns": features["genre_columns"],
+            "people": people,
+            "languages": languages,
+        }
+        try:
+            saved = save_arrays(
+                INDEX_SNAPSHOT_DIR, fingerprint, "features", features_key, arrays, meta
+            )
+        except OSError as e:
+            print(f"Could not save feature columns: {e}")
+            saved = False
+        if not saved:
+            return features
+        return self._load_shared_features(fingerprint, features_key) or features
+
+    def _load_shared_features(self, fingerprint, features_key):
+        """Map the feature columns published by _share_features, or None"""
+        loaded = load_arrays(INDEX_SNAPSHOT_DIR, fingerprint, "features", features_key)
+        if loaded is None:
+            return None
 
-        # Check for genre patterns like "action movies" or "show me comedy"
-        for genre in genres:
-            pattern = rf"\b{re.escape(genre)}\b"
-            if re.search(pattern, query.lower()):
-                return genre
-
-        return None
-
-    def _extract_mood(self, query):
-        """Extract mood information from the query"""
-        # Map of moods and associated patterns
-        mood_patterns = {
-            "happy": [
-                r"\bhappy\b",
-                r"\bfeel good\b",
-                r"\bfeel-good\b",
-                r"\buplifting\b",
-                r"\blight hearted\b",
-            ],
-            "sad": [
-                r"\bsad\b",
-                r"\btearjerker\b",
-                r"\bheartbreaking\b",
-                r"\bmelancholy\b",
-            ],
-            "scary": [
-                r"\bscary\b",
-                r"\bfrightening\b",
-                r"\bcreepy\b",
-                r"\bhorror\b",
-                r"\bterrifying\b",
-            ],
-            "tense": [
-                r"\btense\b",
-                r"\bsuspenseful\b",
-                r"\bthriller\b",
-                r"\banxiety\b",
-            ],
-            "funny": [r"\bfunny\b", r"\bhilarious\b", r"\bcomedy\b", r"\blaugh\b"],
-            "inspirational": [
-                r"\binspirational\b",
-                r"\bmotivational\b",
-                r"\binspiring\b",
-            ],
-            "romantic": [r"\bromantic\b", r"\bromance\b", r"\blove story\b"],
-            "thought-provoking": [
-                r"\bthought provoking\b",
-                r"\bphilosophical\b",
-                r"\bdeep\b",
-                r"\bintellectual\b",
-            ],
+        arrays, meta = loaded
+        offsets, row_ids = arrays["person_offsets"], arrays["person_row_ids"]
+        return {
+            "genre_columns": meta["genre_columns"],
+            "genre_matrix": arrays["genre_matrix"],
+            "release_years": arrays["release_years"],
+            "person_rows": {
+                name: row_ids[offsets[i] : offsets[i + 1]]
+                for i, name in enumerate(meta["people"])
+            },
+            "mood_affinity": arrays["mood_affinity"],
+            "language_masks": dict(zip(meta["languages"], arrays["language_masks"])),
         }
 
-        # Check for mood patterns
-        for mood, patterns in mood_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, query.lower()):
-                    return mood
+    def _build_partitions(self, matrix, features):
+        """
+        Split the TF-IDF rows by language into (rows, sub-matrix) partitions,
+        so a language-filtered query only scores its own partition
+        """
+        partitions = {}
+        for language, mask in features["language_masks"].items():
+            rows = np.flatnonzero(mask)
+            partitions[language] = (rows, matrix[rows])
+        return partitions
+
+    def _share_partitions(self, fingerprint, features_key, partitions):
+        """Publish partitions to the index snapshot, like _share_features"""
+        arrays = {}
+        terms = 0
+        for i, (rows, matrix) in enumerate(partitions.values()):
+            arrays[f"rows_{i}"] = rows
+            for name in ("data", "indices", "indptr"):
+                arrays[f"{name}_{i}"] = getattr(matrix, name)
+            terms = matrix.shape[1]
+        meta = {"languages": list(partitions), "terms": terms}
+        try:
+            saved = save_arrays(
+                INDEX_SNAPSHOT_DIR,
+                fingerprint,
+                "partitions",
+                features_key,
+                arrays,
+                meta,
+            )
+        except OSError as e:
+            print(f"Could not save language partitions: {e}")
+            saved = False
+        if not saved:
+            return partitions
+        return self._load_shared_partitions(fingerprint, features_key) or partitions
+
+    def _load_shared_partitions(self, fingerprint, features_key):
+        """Map the partitions published by _share_partitions, or None"""
+        loaded = load_arrays(
+            INDEX_SNAPSHOT_DIR, fingerprint, "partitions", features_key
+        )
+        if loaded is None:
+            return None
 
-        return None
+        arrays, meta = loaded
+        partitions = {}
+        for i, language in enumerate(meta["languages"]):
+            rows = arrays[f"rows_{i}"]
+            matrix = csr_matrix(
+                (arrays[f"data_{i}"], arrays[f"indices_{i}"], arrays[f"indptr_{i}"]),
+                shape=(len(rows), meta["terms"]),
+                copy=False,
+            )
+            partitions[language] = (rows, matrix)
+        return partitions
+
+    def _start_index_rebuild(self):
+        """Rebuild stale derived indexes in a background thread (one at a time)"""
+        with self._rebuild_lock:
+            if self._rebuild_thread is not None:
+                return  # The running rebuild re-checks versions before exiting
+            self._rebuild_thread = threading.Thread(
+                target=self._rebuild_index_loop, daemon=True
+            )
+            self._rebuild_thread.start()
 
-    def _get_mood_keywords(self, mood):
-        """Return keywords associated with a particular mood"""
-        mood_keywords = {
-            "happy": [
-                "uplifting",
-                "cheerful",
-                "joyful",
-                "optimistic",
-                "fun",
-                "heartwarming",
-            ],
-            "sad": [
-                "tragic",
-                "melancholy",
-                "grief",
-                "depression",
-                "emotional",
-                "heartbreaking",
-            ],
-            "scary": [
-                "horror",
-                "terror",
-                "nightmare",
-                "creepy",
-                "haunting",
-                "frightening",
-                "supernatural",
-            ],
-            "tense": [
-                "suspense",
-                "thriller",
-                "anxiety",
-                "adrenaline",
-                "intense",
-                "psychological",
-            ],
-            "funny": [
-                "comedy",
-                "laugh",
-                "humorous",
-                "gag",
-                "joke",
-                "silly",
-                "parody",
-                "satire",
-            ],
-            "inspirational": [
-                "triumph",
-                "overcome",
-                "motivational",
-                "journey",
-                "victory",
-                "success",
-            ],
-            "romantic": [
-                "love",
-                "romance",
-                "relationship",
-                "passion",
-                "dating",
-                "marriage",
-            ],
-            "thought-provoking": [
-                "philosophical",
-                "deep",
-                "contemplative",
-                "existential",
-                "meaningful",
-            ],
-        }
+    def _rebuild_index_loop(self):
+        """Keep re-fitting until the TF-IDF index and neighbors match the dataset"""
+        while True:
+            try:
+                tfidf = self._tfidf
+                if tfidf.version != self._dataset_version:
+                    tfidf = self._prepare_tfidf()
+                self._build_neighbor_table(tfidf)
+                self._build_ann_index(tfidf)
+            except Exception as e:
+                print(f"Error rebuilding index: {e}")
+                with self._rebuild_lock:
+                    self._rebuild_thread = None
+                return
 
-        return mood_keywords.get(mood.lower(), [])
+            with self._rebuild_lock:
+                if self._neighbors["version"] == self._dataset_version:
+                    self._rebuild_thread = None
+                    return
 
-    def _extract_actor(self, query):
-        """Extract actor information from the query"""
-        # Simple pattern matching for "with [actor]" or "[actor] movies"
-        actor_patterns = [
-            r"with\s+([A-Z][a-z]+\s+[A-Z][a-z]+)",  # "with Tom Hanks"
-            r"starring\s+([A-Z][a-z]+\s+[A-Z][a-z]+)",  # "starring Brad Pitt"
-            r"([A-Z][a-z]+\s+[A-Z][a-z]+)\s+movies",  # "Leonardo DiCaprio movies"
-        ]
+    def _build_neighbor_table(self, tfidf):
+        """
+        Precompute the top NEIGHBOR_K most similar movies for every movie of
+        a TfidfIndex, overall and restricted to each language
+        """
+        version = tfidf.version
+        fingerprint, features_key = tfidf.keys
+        neighbors_key = f"{features_key}:k{NEIGHBOR_K}"
+
+        # Another worker may already have published the table for this index
+        tables = self._load_shared_neighbors(fingerprint, neighbors_key)
+        if tables is not None:
+            self._neighbors = {"version": version, "tables": tables}
+            print("Loaded neighbor table snapshot")
+            return
 
-        for pattern in actor_patterns:
-            match = re.search(pattern, query)
-            if match:
-                return match.group(1)
-
-        return None
-
-    def _extract_decade(self, query):
-        """Extract decade information from the query"""
-        # Match patterns like "80s movies", "1990s films", "movies from the 70's"
-        decade_patterns = [
-            r"(\d0)s\s+(?:movies|films)",  # "90s movies"
-            r"(\d{3}0)s\s+(?:movies|films)",  # "1990s movies"
-            r"(?:movies|films)\s+from\s+the\s+(\d0)(?:'s|s)",  # "movies from the 80's"
-            r"(?:movies|films)\s+from\s+the\s+(\d{3}0)(?:'s|s)",  # "movies from the 1980's"
-        ]
+        start_time = time.time()
+        languages = np.array([movie.get("language", "") for movie in self.movies])
+        languages = languages[: tfidf.matrix.shape[0]]
+        tables = {None: self._top_k_neighbors(tfidf.matrix, np.arange(len(languages)))}
+        for language in np.unique(languages):
+            tables[language] = self._top_k_neighbors(
+                tfidf.matrix, np.flatnonzero(languages == language)
+            )
 
-        for pattern in decade_patterns:
-            match = re.search(pattern, query.lower())
-            if match:
-                decade = match.group(1)
-                # Convert to full decade (80 -> 1980, 90 -> 1990)
-                if len(decade) == 2:
-                    if (
-                        int(decade) <= 20
-                    ):  # Assume 00s, 10s, 20s refer to 2000s, 2010s, 2020s
-                        decade = "20" + decade
-                    else:
-                        decade = "19" + decade
-                return int(decade)
-
-        return None
-
-    def _clean_search_prefixes(self, query):
-        """Remove common search prefixes like 'show me', 'recommend', etc."""
-        prefixes = [
-            r"^show me\s+",
-            r"^find\s+",
-            r"^recommend\s+",
-            r"^suggest\s+",
-            r"^i want to watch\s+",
-            r"^i want to see\s+",
-            r"^i'm looking for\s+",
-            r"^i am looking for\s+",
-        ]
+        self._neighbors = {"version": version, "tables": tables}
+        print(f"Neighbor table built in {time.time() - start_time:.2f}s")
 
-        cleaned = query
-        for prefix in prefixes:
-            cleaned = re.sub(prefix, "", cleaned, flags=re.IGNORECASE)
-
-        return cleaned
-
-    def _correct_movie_terms(self, query):
-        """
-        Correct common misspellings in movie searches
-        """
-        common_terms = {
-            "marvle": "marvel",
-            "starwars": "star wars",
-            "harry poter": "harry potter",
-            "jurrasic": "jurassic",
-            "batmen": "batman",
-            "lordoftherings": "lord of the rings",
-            "pirates of caribean": "pirates of caribbean",
-            "fast and furios": "fast and furious",
-            "avengrs": "avengers",
-            "bollywod": "bollywood",
-            "holywood": "hollywood",
-            "comdy": "comedy",
-            "acton": "action",
-            "horrer": "horror",
-            "scifi": "sci-fi",
-            "romcom": "romantic comedy",
-            "syfy": "sci-fi",
+        arrays = {}
+        for i, (rows, scores) in enumerate(tables.values()):
+            arrays[f"rows_{i}"], arrays[f"scores_{i}"] = rows, scores
+        try:
+            saved = save_arrays(
+                INDEX_SNAPSHOT_DIR,
+                fingerprint,
+                "neighbors",
+                neighbors_key,
+                arrays,
+                {"languages": list(tables)},
+            )
+        except OSError as e:
+            print(f"Could not save neighbor table: {e}")
+            saved = False
+        if saved:
+            # Swap the private copy for the shared, memory-mapped one
+            tables = self._load_shared_neighbors(fingerprint, neighbors_key)
+            if tables is not None:
+                self._neighbors = {"version": version, "tables": tables}
+
+    def _load_shared_neighbors(self, fingerprint, neighbors_key):
+        """Map the neighbor tables published to the index snapshot, or None"""
+        loaded = load_arrays(INDEX_SNAPSHOT_DIR, fingerprint, "neighbors", neighbors_key)
+        if loaded is None:
+            return None
+        arrays, meta = loaded
+        return {
+            language: (arrays[f"rows_{i}"], arrays[f"scores_{i}"])
+            for i, language in enumerate(meta["languages"])
         }
 
-        corrected = query
-        for misspelled, correct in common_terms.items():
-            # Use word boundary to match whole words
-            pattern = r"\b" + re.escape(misspelled) + r"\b"
-            corrected = re.sub(pattern, correct, corrected, flags=re.IGNORECASE)
-
-        return corrected
-
-    def _expand_query(self, query):
-        """
-        Expand query with semantically related terms for better matching
-        """
-        expansions = {
-            "scary": ["horror", "thriller", "suspense", "frightening", "terror"],
-            "kids": [
-                "family",
-                "animation",
-                "disney",
-                "pixar",
-                "children",
-                "child-friendly",
-            ],
-            "sad": ["drama", "tragedy", "emotional", "tearjerker", "heartbreaking"],
-            "superhero": ["marvel", "dc", "comic", "avengers", "superpower", "hero"],
-            "funny": ["comedy", "humor", "laugh", "hilarious", "gag", "joke"],
-            "space": [
-                "sci-fi",
-                "science fiction",
-                "alien",
-                "outer space",
-                "interstellar",
-                "galaxy",
-            ],
-            "war": ["battle", "military", "army", "soldier", "combat", "warfare"],
-            "romantic": [
-                "romance",
-                "love story",
-                "relationship",
-                "love",
-                "date",
-                "couple",
-            ],
-            "detective": [
-                "mystery",
-                "crime",
-                "investigation",
-                "sleuth",
-                "whodunit",
-                "thriller",
-            ],
-            "musical": ["music", "song", "dance", "singing", "broadway"],
-            "historical": [
-                "history",
-                "period",
-                "era",
-                "ancient",
-                "medieval",
-                "century",
-            ],
-            "college": [
-                "university",
-                "campus",
-                "school",
-                "student",
-                "teen",
-                "young adult",
-            ],
-            "family": ["kids", "children", "parents", "home", "family-friendly"],
-        }
+    def _build_ann_index(self, tfidf):
+        """Fit the IVF index used by the "ivf" engine on large catalogs"""
+        n_movies, n_terms = tfidf.matrix.shape
+        if n_movies < ANN_MIN_MOVIES or n_terms < 2:
+            self._ann = None
+            return
 
-        expanded_terms = []
-        query_lower = query.lower()
+        start_time = time.time()
+        # Per-language posting lists serve language-filtered queries
+        index = IVFIndex.build(tfidf.matrix, groups=tfidf.features["language_masks"])
+        self._ann = {"version": tfidf.version, "index": index}
+        print(
+            f"ANN index ({index.n_lists} cells) built in "
+            f"{time.time() - start_time:.2f}s"
+        )
 
-        for term, synonyms in expansions.items():
-            if term in query_lower:
-                expanded_terms.extend(synonyms)
+    def _ann_engine(self, tfidf, engine=None):
+        """
+        Return the IVF index when `engine` (default SEARCH_ENGINE) is "ivf"
+        and the index was built from `tfidf`, otherwise None, in which case
+        callers score exactly
+        """
+        ann = self._ann
+        if (engine or SEARCH_ENGINE) != "ivf" or ann is None:
+            return None
+        return ann["index"] if ann["version"] == tfidf.version else None
 
-        if expanded_terms:
-            expanded_query = f"{query} {' '.join(expanded_terms)}"
-            return expanded_query
+    def _top_k_neighbors(self, matrix, candidates):
+        """
+        Return (rows, scores) arrays of shape (n_movies, k) holding, for every
+        row of the TF-IDF `matrix`, its most similar rows among `candidates`
+        in descending order. Similarities are computed in blocks of sparse
+        products so memory stays bounded regardless of corpus size.
+        """
+        n = matrix.shape[0]
+        k = min(NEIGHBOR_K, len(candidates) - 1)
+        rows = np.zeros((n, max(k, 0)), dtype=np.int32)
+        scores = np.zeros((n, max(k, 0)), dtype=np.float32)
+        if k <= 0:
+            return rows, scores
+
+        # TF-IDF rows are L2-normalized, so the dot product is the cosine
+        candidates_t = matrix[candidates].T.tocsr()
+        position = np.full(n, -1, dtype=np.int64)
+        position[candidates] = np.arange(len(candidates))
+        block_size = max(1, NEIGHBOR_BLOCK_CELLS // len(candidates))
+
+        for start in range(0, n, block_size):
+            end = min(start + block_size, n)
+            block = (matrix[start:end] @ candidates_t).toarray().astype(np.float32)
+
+            # A movie is never its own neighbor
+            own = position[start:end]
+            inside = np.flatnonzero(own >= 0)
+            block[inside, own[inside]] = -np.inf
+
+            top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(block, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            rows[start:end] = candidates[np.take_along_axis(top, order, axis=1)]
+            scores[start:end] = np.take_along_axis(top_scores, order, axis=1)
+
+        return rows, scores
+
+    def search_movies(self, query, limit=10, language=None, engine=None):
+        """
+        Enhanced search with genre, mood, and common term understanding
+        """
+        if not query:
+            return self._get_random_recommendations(limit, language)
 
-        return query
+        parsed = self.query_analyzer.analyze(query)
+        tfidf = self._tfidf
+        ann_index = self._ann_engine(tfidf, engine)
+        return self._scored_results(
+            *self._search_parsed(tfidf, parsed, limit, language, ann_index)
+        )
 
-    def get_movie_recommendations(self, movie_id, limit=10, language=None):
-        """Get movie recommendations based on a specific movie"""
-        # Find the movie in our dataset
-        movie_idx = None
-        for idx, movie in enumerate(self.movies):
-            if str(movie["id"]) == str(movie_id):
-                movie_idx = idx
-                break
+    def _search_parsed(self, tfidf, parsed, limit=10, language=None, ann_index=None):
+        """
+        Return (rows, scores) ranked against a TfidfIndex for an already
+        analyzed query, exactly or, when `ann_index` is given, over the
+        approximate candidates it finds
+        """
+        # Log what was detected (for debugging)
+        detections = []
+        if parsed.genre:
+            detections.append(f"Genre: {parsed.genre}")
+        if parsed.mood:
+            detections.append(f"Mood: {parsed.mood}")
+        if parsed.actor:
+            detections.append(f"Actor: {parsed.actor}")
+        if parsed.decade:
+            detections.append(f"Decade: {parsed.decade}")
 
-        if movie_idx is None:
-            return {"error": "Movie not found in the database"}
+        if detections:
+            print(f"Search query '{parsed.original}' detected: {', '.join(detections)}")
+
+        # Transform query to the same vector space
+        query_vector = tfidf.vectorizer.transform([parsed.processed])
+        patterns = (parsed.genre, parsed.mood, parsed.actor, parsed.decade)
 
-        # Calculate similarity with all other movies
-        movie_vector = self.tfidf_matrix[movie_idx]
-        sim_scores = cosine_similarity(movie_vector, self.tfidf_matrix).flatten()
-
-        # Get movie indices with highest similarity (excluding the movie itself)
-        indices = list(range(len(sim_scores)))
-        indices.sort(key=lambda x: sim_scores[x], reverse=True)
-        indices = [
-            idx for idx in indices if idx != movie_idx
-        ]  # Exclude the movie itself
-
-        # Apply language filter if specified
-        recommendations = []
-        count = 0
-
-        for idx in indices:
-            movie = self.movies[idx]
-            # Apply language filter if specified
-            if language and movie.get("language") != language:
+        if ann_index is not None:
+            return self._ann_top_k(
+                tfidf, ann_index, query_vector, limit, language, patterns=patterns
+            )
+
+        # Score the language's partition (or every partition), boosted by the
+        # detected patterns, and keep the highest similarities
+        return self._rank_partitions(
+            tfidf, query_vector, limit, language, patterns=patterns
+        )
+
+    def search_many(self, queries, limit=10, language=None):
+        """Run several searches at once; returns one result list per query"""
+        return [
+            self._scored_results(*ranked)
+            for ranked in self.rank_search_many(queries, limit, language)
+        ]
+
+    def rank_search_many(self, queries, limit=10, language=None):
+        """
+        Return (rows, scores) for each of several queries. Queries not in the
+        search cache are vectorized together and scored with one sparse
+        product per block, so bulk callers pay the per-query overhead once
+        per batch instead of once per query.
+        """
+        results = [None] * len(queries)
+        pending = {}  # Cache key -> (parsed query, positions in `queries`)
+        for position, query in enumerate(queries):
+            if not query:
+                results[position] = self.rank_random(limit, language)
                 continue
 
-            # Add similarity score to movie data
-            movie_with_score = movie.copy()
-            movie_with_score["similarity"] = float(sim_scores[idx])
+            parsed = self.query_analyzer.analyze(query)
+            cache_key = (parsed.cache_key, limit, language or None, "exact")
+            cached = self._search_cache.get(cache_key)
+            if cached is not None:
+                results[position] = cached
+            else:
+                pending.setdefault(cache_key, (parsed, []))[1].append(position)
+
+        if not pending:
+            return results
 
-            recommendations.append(movie_with_score)
-            count += 1
+        keys = list(pending)
+        parsed_queries = [pending[key][0] for key in keys]
+        tfidf = self._tfidf
+        if language:
+            # Only the language's partition is scored
+            partition = tfidf.partitions.get(language)
+            if partition is None:
+                for key in keys:
+                    for position in pending[key][1]:
+                        results[position] = (np.array([], dtype=np.int64), np.array([]))
+                return results
+            rows, matrix = partition
+        else:
+            rows, matrix = None, tfidf.matrix
+        query_vectors = tfidf.vectorizer.transform(
+            [p.processed for p in parsed_queries]
+        )
+        block_size = max(1, NEIGHBOR_BLOCK_CELLS // max(matrix.shape[0], 1))
+        boosts = {}  # Detected patterns -> boost vector, shared by equal queries
 
-            if count >= limit:
-                break
+        for start in range(0, len(keys), block_size):
+            end = min(start + block_size, len(keys))
+            # TF-IDF rows are L2-normalized, so the dot product is the cosine
+            scores = (query_vectors[start:end] @ matrix.T).toarray()
 
-        return recommendations
+            patterns = [
+                (p.genre, p.mood, p.actor, p.decade) for p in parsed_queries[start:end]
+            ]
+            for pattern in patterns:
+                if any(pattern) and pattern not in boosts:
+                    boosts[pattern] = self._pattern_boost(
+                        tfidf.features, *pattern, rows=rows
+                    )
+            boosted = [i for i, pattern in enumerate(patterns) if any(pattern)]
+            if boosted:
+                scores[boosted] *= np.vstack([boosts[patterns[i]] for i in boosted])
+
+            ranked = self._top_k_rows_batch(scores, limit)
+            if rows is not None:
+                ranked = [(rows[top], top_scores) for top, top_scores in ranked]
+            for key, query_ranked in zip(keys[start:end], ranked):
+                self._search_cache.put(key, query_ranked)
+                for position in pending[key][1]:
+                    results[position] = query_ranked
 
-    @lru_cache(maxsize=100)
-    def _get_search_results_cached(self, query, limit, language):
-        """Cached version of search to improve performance for repeated queries"""
-        return self.search_movies(query, limit, language)
+        return results
 
-    def search_movies_enhanced(self, query, limit=10, language=None):
+    def _rank_partitions(
+        self, tfidf, vector, limit, language=None, exclude=None, patterns=None
+    ):
         """
-        Enhanced search with query expansion, spelling correction, and caching
+        Return (rows, scores) of the `limit` movies of a TfidfIndex most
+        similar to `vector` (a TF-IDF row or a dense term vector). Only the
+        partition of `language` is scored, so filtered queries cost its size;
+        without a language every partition is scored and their top-k lists
+        are merged.
+        Rows in `exclude` are skipped and `patterns` are the query's
+        (genre, mood, actor, decade) boosts.
         """
-        # Check if query has common misspellings of popular movie terms
-        corrected_query = self._correct_movie_terms(query)
-        if corrected_query != query:
-            print(f"Corrected query: '{query}' to '{corrected_query}'")
-            query = corrected_query
+        if language:
+            partition = tfidf.partitions.get(language)
+            if partition is None:
+                return np.array([], dtype=np.int64), np.array([])
+            partitions = [partition]
+        else:
+            partitions = tfidf.partitions.values()
+
+        best_rows, best_scores = [np.array([], dtype=np.int64)], [np.array([])]
+        for rows, matrix in partitions:
+            # TF-IDF rows are L2-normalized, so the dot product is the cosine
+            scores = matrix @ vector.T
+            scores = scores.toarray().ravel() if issparse(scores) else scores
+            if patterns and any(patterns):
+                scores = scores * self._pattern_boost(
+                    tfidf.features, *patterns, rows=rows
+                )
+            if exclude is not None:
+                scores[_positions_in(rows, exclude)] = -np.inf
 
-        # First try the cache
-        cache_key = f"{query}_{limit}_{language}"
-        cache_results = self._search_cache.get(cache_key)
-        if cache_results:
-            return cache_results
+            top, top_scores = self._top_k_rows(scores, limit)
+            best_rows.append(rows[top])
+            best_scores.append(top_scores)
 
-        # Perform standard search
-        results = self.search_movies(query, limit, language)
+        # Merge the per-partition winners
+        rows, scores = np.concatenate(best_rows), np.concatenate(best_scores)
+        top, top_scores = self._top_k_rows(scores, limit)
+        return rows[top], top_scores
 
-        # Store in cache (with a cap on cache size)
-        if len(self._search_cache) > 1000:  # Limit cache size
-            self._search_cache.clear()
-        self._search_cache[cache_key] = results
+    def _top_k_rows(self, scores, limit, exclude=None):
+        """
+        Return (indices, scores) of the `limit` best scores in descending
+        order, skipping the indices in `exclude`. Uses a partial sort, so
+        only the winners are ordered.
+        """
+        if exclude is not None:
+            scores = scores.copy()
+            scores[exclude] = -np.inf
 
-        return results
+        k = min(limit, len(scores))
+        if k <= 0:
+            return np.array([], dtype=np.int64), np.array([])
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        top = top[np.isfinite(scores[top])]  # Drop masked-out rows
+        return top, scores[top]
 
-    def _correct_movie_terms(self, query):
+    def _ann_top_k(
+        self, tfidf, index, vector, limit, language=None, exclude=None, patterns=None
+    ):
         """
-        Correct common misspellings in movie searches
+        Approximate _top_k_rows for one TF-IDF query row: only the candidates
+        from the IVF cells nearest to `vector` (in the language's posting
+        lists) are scored, exactly, and boosted by the query's (genre, mood,
+        actor, decade) `patterns`, so no step costs the catalog size.
         """
-        common_terms = {
-            "marvle": "marvel",
-            "starwars": "star wars",
-            "harry poter": "harry potter",
-            "jurrasic": "jurassic",
-            "batmen": "batman",
-            "lordoftherings": "lord of the rings",
-            "pirates of caribean": "pirates of caribbean",
-            "fast and furios": "fast and furious",
-            "avengrs": "avengers",
-        }
+        empty = (np.array([], dtype=np.int64), np.array([]))
+        if language and language not in index.lists:
+            return empty
 
-        corrected = query
-        for misspelled, correct in common_terms.items():
-            # Use word boundary to match whole words
-            pattern = r"\b" + re.escape(misspelled) + r"\b"
-            corrected = re.sub(pattern, correct, corrected, flags=re.IGNORECASE)
+        candidates = index.candidates(
+            vector, ANN_PROBE, limit * ANN_CANDIDATE_FACTOR, language or None
+        )
+        if exclude is not None:
+            candidates = candidates[~np.isin(candidates, exclude)]
+        k = min(limit, len(candidates))
+        if k <= 0:
+            return empty
+
+        # TF-IDF rows are L2-normalized, so the dot product is the cosine
+        candidates = np.sort(candidates)  # _pattern_boost takes sorted rows
+        scores = (tfidf.matrix[candidates] @ vector.T).toarray().ravel()
+        if patterns and any(patterns):
+            scores *= self._pattern_boost(tfidf.features, *patterns, rows=candidates)
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return candidates[top], scores[top]
+
+    def _top_k_rows_batch(self, scores, limit):
+        """
+        Row-wise _top_k_rows for a 2-D (queries x movies) score array. Returns
+        a list of (indices, scores) pairs, one per query.
+        """
+        empty = (np.array([], dtype=np.int64), np.array([]))
+        k = min(limit, scores.shape[1])
+        if k <= 0:
+            return [empty] * len(scores)
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        finite = np.isfinite(top_scores)  # Drop excluded rows
+        return [
+            (rows[keep], row_scores[keep])
+            for rows, row_scores, keep in zip(top, top_scores, finite)
+        ]
 
-        return corrected
+    def _scored_results(self, rows, scores):
+        """Build response dicts for ranked rows, each with its similarity score"""
+        return [
+            dict(self.movies[row], similarity=float(score))
+            for row, score in zip(rows, scores)
+        ]
 
-    def _expand_query(self, query):
+    def movies_json(self, ranked, fields=DEFAULT_FIELDS):
         """
-        Expand query with synonyms for better matching
+        Encode ranked (rows, scores) as a JSON array of movies projected to
+        `fields` (None for every field), spliced from pre-encoded fragments
         """
-        expansions = {
-            "scary": ["horror", "thriller", "suspense"],
-            "kids": ["family", "animation", "disney", "pixar"],
-            "sad": ["drama", "tragedy"],
-            "superhero": ["marvel", "dc", "comic", "avengers"],
-            "funny": ["comedy", "humor", "laugh"],
-            "space": ["sci-fi", "science fiction", "alien"],
-            "war": ["battle", "military", "army", "soldier"],
-        }
+        rows, scores = ranked
+        return self.payloads.render(self.movies, rows, scores, fields)
 
-        expanded_terms = []
-        query_lower = query.lower()
+    def _pattern_boost(
+        self, features, genre=None, mood=None, actor=None, decade=None, rows=None
+    ):
+        """
+        Per-movie multiplier for the detected genre/mood/actor/decade from an
+        index's feature columns, for every movie or only for the sorted
+        `rows` (e.g. one partition)
+        """
+        select = slice(None) if rows is None else rows
+        boost = np.ones(len(features["release_years"]) if rows is None else len(rows))
+
+        # Boost by genre
+        if genre:
+            col = features["genre_columns"].get(genre.lower())
+            if col is not None:
+                boost += 0.5 * features["genre_matrix"][select, col]
+
+        # Boost by mood (mood terms in overview and keywords)
+        if mood:
+            col = MOOD_COLUMNS.get(mood.lower())
+            if col is not None:
+                boost += features["mood_affinity"][select, col]
+
+        # Boost by actor
+        if actor:
+            person_rows = features["person_rows"].get(actor.lower())
+            if person_rows is not None:
+                if rows is not None:
+                    person_rows = _positions_in(rows, person_rows)
+                boost[person_rows] += 0.4
+
+        # Boost by decade
+        if decade:
+            years = features["release_years"][select]
+            boost += 0.3 * ((years > 0) & ((years // 10) * 10 == decade))
+
+        return boost
 
-        for term, synonyms in expansions.items():
-            if term in query_lower:
-                expanded_terms.extend(synonyms)
+    def _get_mood_keywords(self, mood):
+        """Return keywords associated with a particular mood"""
+        return MOOD_KEYWORDS.get(mood.lower(), [])
 
-        if expanded_terms:
-            expanded_query = f"{query} {' '.join(expanded_terms)}"
-            print(f"Expanded query: '{query}' to '{expanded_query}'")
-            return expanded_query
+    def get_movie_recommendations(
+        self, movie_id, limit=10, language=None, engine=None
+    ):
+        """Get movie recommendations based on a specific movie"""
+        ranked = self.rank_recommendations(movie_id, limit, language, engine)
+        return ranked if isinstance(ranked, dict) else self._scored_results(*ranked)
 
-        return query
+    def rank_recommendations(self, movie_id, limit=10, language=None, engine=None):
+        """
+        Return (rows, scores) of the movies most similar to one movie, or an
+        error dict. Without a language, recommendations are in the movie's
+        own language. The precomputed neighbor table is used whenever it is
+        current; otherwise scoring is exact, or approximate when `engine`
+        selects the IVF index.
+        """
+        # Find the movie in our dataset
+        movie_idx = self.row_of(movie_id)
 
-    def _get_random_recommendations(self, limit=10, language=None):
-        """Get random movie recommendations with optional language filter"""
-        filtered_movies = self.movies
+        if movie_idx is None:
+            return {"error": "Movie not found in the database"}
 
-        # Apply language filter if specified
-        if language:
-            filtered_movies = [
-                movie for movie in self.movies if movie.get("language") == language
-            ]
+        # Default to recommendations in the movie's own language
+        language = language or self.movies[movie_idx].get("language")
+
+        # Serve from the precomputed neighbor table when it is current
+        neighbors = self._neighbors
+        if neighbors is not None and neighbors["version"] == self._dataset_version:
+            table = neighbors["tables"].get(language or None)
+            if table is None:
+                # No movies in that language
+                return np.array([], dtype=np.int64), np.array([])
+            rows, scores = table
+            # A table narrower than NEIGHBOR_K already holds every candidate
+            if limit <= rows.shape[1] or rows.shape[1] < NEIGHBOR_K:
+                return rows[movie_idx, :limit], scores[movie_idx, :limit]
+
+        tfidf = self._tfidf
+        if movie_idx >= tfidf.matrix.shape[0]:
+            return {"error": "Movie is not indexed yet"}
+
+        movie_vector = tfidf.matrix[movie_idx]
+        ann_index = self._ann_engine(tfidf, engine)
+        if ann_index is not None:
+            return self._ann_top_k(
+                tfidf, ann_index, movie_vector, limit, language, exclude=[movie_idx]
+            )
 
-        # Shuffle and return limited number
-        random_selection = random.sample(
-            filtered_movies, min(limit, len(filtered_movies))
+        # Most similar movies in the language's partition (excluding the movie)
+        return self._rank_partitions(
+            tfidf, movie_vector, limit, language, exclude=[movie_idx]
         )
 
-        # Add a placeholder similarity score
-        for movie in random_selection:
-            movie_with_score = movie.copy()
-            movie_with_score["similarity"] = (
-                0.0  # Zero similarity for random recommendations
+    def get_recommendations_for_movies(
+        self, movie_ids, limit=10, language=None, weights=None
+    ):
+        """Recommend movies similar to a set of seed movies ("more like these")"""
+        ranked = self.rank_for_movies(movie_ids, limit, language, weights)
+        return ranked if isinstance(ranked, dict) else self._scored_results(*ranked)
+
+    def rank_for_movies(self, movie_ids, limit=10, language=None, weights=None):
+        """
+        Return (rows, scores) of the movies most similar to a set of seeds, or
+        an error dict. Seeds are combined into one weighted centroid of their
+        TF-IDF rows, so the corpus is scored once however many seeds there
+        are. The seeds themselves are never recommended. Without a language,
+        recommendations are in the seeds' language when they all share one.
+        """
+        if weights is None:
+            weights = [1.0] * len(movie_ids)
+        if len(weights) != len(movie_ids):
+            return {"error": "Expected one weight per movie ID"}
+        if any(not math.isfinite(weight) or weight <= 0 for weight in weights):
+            return {"error": "Weights must be positive finite numbers"}
+
+        tfidf = self._tfidf
+        matrix = tfidf.matrix
+        seeds = {}  # Row -> summed weight, so repeated IDs are not double-excluded
+        for movie_id, weight in zip(movie_ids, weights):
+            row = self.row_of(movie_id)
+            if row is not None and row < matrix.shape[0]:
+                seeds[row] = seeds.get(row, 0.0) + weight
+        if not seeds:
+            return {"error": "None of the movies are in the database"}
+
+        if not language:
+            # Default to the seeds' language when they all share one
+            languages = {self.movies[row].get("language") for row in seeds}
+            if len(languages) == 1:
+                language = languages.pop()
+
+        rows = np.fromiter(seeds, dtype=np.int64)
+        seed_weights = np.fromiter(seeds.values(), dtype=np.float64)
+        centroid = matrix[rows].T @ seed_weights
+        norm = np.linalg.norm(centroid)
+        if norm > 0:
+            centroid /= norm  # Scores become cosine similarities to the centroid
+
+        # TF-IDF rows are L2-normalized, so this is one sparse matrix-vector
+        # product per scored partition
+        return self._rank_partitions(tfidf, centroid, limit, language, exclude=rows)
+
+    def ann_recall_report(self, k=10, samples=200, seed=0):
+        """
+        Compare the IVF engine with exact scoring on `samples` random movies
+        used as queries: recall@k of the approximate top k, mean candidates
+        scored per query and mean latency of both paths
+        """
+        tfidf = self._tfidf
+        index = self._ann_engine(tfidf, "ivf")
+        if index is None:
+            return {"error": f"ANN index is built for {ANN_MIN_MOVIES}+ movies"}
+
+        matrix = tfidf.matrix
+        rng = np.random.default_rng(seed)
+        queries = rng.choice(matrix.shape[0], min(samples, matrix.shape[0]), False)
+        found = expected = candidates = 0
+        exact_time = ann_time = 0.0
+
+        for row in queries:
+            vector = matrix[row]
+            start = time.perf_counter()
+            exact_rows, _ = self._rank_partitions(tfidf, vector, k, exclude=[row])
+            exact_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            ann_rows, _ = self._ann_top_k(tfidf, index, vector, k, exclude=[row])
+            ann_time += time.perf_counter() - start
+
+            candidates += len(
+                index.candidates(vector, ANN_PROBE, k * ANN_CANDIDATE_FACTOR)
             )
+            found += len(np.intersect1d(exact_rows, ann_rows))
+            expected += len(exact_rows)
+
+        return {
+            "movies": matrix.shape[0],
+            "cells": index.n_lists,
+            "probe": ANN_PROBE,
+            "k": k,
+            "queries": len(queries),
+            "recall_at_k": found / expected if expected else 1.0,
+            "mean_candidates": candidates / len(queries),
+            "exact_ms": 1000 * exact_time / len(queries),
+            "ann_ms": 1000 * ann_time / len(queries),
+        }
+
+    def search_movies_enhanced(self, query, limit=10, language=None, engine=None):
+        """
+        Enhanced search with query expansion, spelling correction, and caching
+        """
+        return self._scored_results(*self.rank_search(query, limit, language, engine))
 
-        return random_selection
+    def rank_search(self, query, limit=10, language=None, engine=None):
+        """Return (rows, scores) for search_movies_enhanced, through the cache"""
+        if not query:
+            return self.rank_random(limit, language)
 
+        # Spelling correction, pattern detection and expansion in one pass
+        parsed = self.query_analyzer.analyze(query)
+        if parsed.corrected != query:
+            print(f"Corrected query: '{query}' to '{parsed.corrected}'")
 
-# Initialize recommender system
-recommender = MovieRecommender()
+        # First try the cache
+        tfidf = self._tfidf
+        ann_index = self._ann_engine(tfidf, engine)
+        engine = "ivf" if ann_index is not None else "exact"
+        cache_key = (parsed.cache_key, limit, language or None, engine)
+        cached = self._search_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
+        # Perform standard search
+        ranked = self._search_parsed(tfidf, parsed, limit, language, ann_index)
+        self._search_cache.put(cache_key, ranked)
+
+        return ranked
+
+    def cache_stats(self):
+        """Hit/miss/eviction counters for the in-process caches"""
+        return {
+            "search": self._search_cache.stats(),
+            "trailers": dict(
+                self._trailers.stats(), coalesced=self._trailer_flights.coalesced
+            ),
+            "details": {"coalesced": self._details_flights.coalesced},
+        }
 
-@app.route("/")
-def serve_frontend():
-    return send_from_directory("../frontend", "index.html")
+    def get_trailer_key(self, movie_id):
+        """
+        YouTube key of a movie's trailer, or None if it has none. Keys stored
+        with the movie at ingestion are served directly; other movies are
+        looked up on TMDB once and cached (including "no trailer"), with
+        concurrent lookups of the same movie sharing one request. Raises
+        ConnectionError if TMDB could not be reached.
+        """
+        row = self._row_by_id.get(movie_id)
+        if row is not None and "trailer_key" in self.movies[row]:
+            return self.movies[row]["trailer_key"]
+
+        key = self._trailers.get(movie_id, _MISSING)
+        if key is _MISSING:
+            key = self._trailer_flights.do(
+                movie_id, partial(self._fetch_trailer_key, movie_id)
+            )
+        return key
 
+    def _fetch_trailer_key(self, movie_id):
+        """Look up a trailer key on TMDB and cache the answer"""
+        # The LRU is the trailer cache; a stored response is reused only for
+        # as long as a "no trailer" answer is, so a miss is really re-asked
+        data = self.tmdb.get(f"movie/{movie_id}/videos", max_age=TRAILER_MISS_TTL)
+        if data is None:
+            raise ConnectionError("TMDB request failed")
 
-@app.route("/<path:path>")
-def serve_static(path):
-    return send_from_directory("../frontend", path)
+        key = _trailer_key(data)
+        self._trailers.put(movie_id, key, ttl=None if key else TRAILER_MISS_TTL)
+        return key
 
+    def _get_random_recommendations(self, limit=10, language=None):
+        """Get random movie recommendations with optional language filter"""
+        return self._scored_results(*self.rank_random(limit, language))
 
-@app.route("/api/trailer/<int:movie_id>", methods=["GET"])
-def get_trailer(movie_id):
-    url = f"{TMDB_BASE_URL}/movie/{movie_id}/videos?api_key={recommender.api_key}"
-    try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            videos = response.json().get("results", [])
-            for video in videos:
-                if video["site"] == "YouTube" and video["type"] == "Trailer":
-                    return jsonify({"key": video["key"]})
-            return jsonify({"error": "Trailer not found"}), 404
+    def rank_random(self, limit=10, language=None):
+        """Return (rows, zero scores) of random movies, optionally in one language"""
+        pool = self._browse_pool(language)
+        rows = np.array(random.sample(pool, min(limit, len(pool))), dtype=np.int64)
+        return rows, np.zeros(len(rows))
+
+    def browse(self, limit=10, language=None, cursor=None):
+        """
+        Page through movies (optionally of one language) in a random order
+        that is fixed for a browsing session, so pages never repeat a movie.
+        Without a cursor a new session starts. Returns (rows, zero scores,
+        next cursor); the cursor is None once every movie has been shown.
+        Raises ValueError for a malformed or foreign cursor.
+        """
+        if cursor:
+            seed, count, offset, language = _decode_cursor(cursor)
         else:
-            return jsonify({"error": f"TMDB error {response.status_code}"}), 500
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+            seed, count, offset = random.getrandbits(32), None, 0
+
+        pool = self._browse_pool(language)
+        if count is None:
+            count = len(pool)  # Movies added later join the next session
+        elif count > len(pool):
+            raise ValueError("Cursor does not match this dataset")
+
+        # Page positions are mapped through the session's shuffle one by
+        # one, so a page costs O(limit) whatever the pool size
+        page = np.arange(offset, min(offset + max(limit, 0), count))
+        positions = _browse_positions(seed, count, page)
+        rows = np.fromiter((pool[p] for p in positions), np.int64, len(positions))
+
+        next_offset = offset + len(positions)
+        next_cursor = None
+        if next_offset < count:
+            next_cursor = _encode_cursor(seed, count, next_offset, language)
+        return rows, np.zeros(len(rows)), next_cursor
+
+    def _browse_pool(self, language=None):
+        """Rows of every movie, or of one language (maintained on add)"""
+        if language:
+            return self._rows_by_language.get(language, [])
+        return range(len(self.movies))
 
 
-@app.route("/api/search", methods=["GET"])
-def search_movies():
-    """API endpoint for searching movies with advanced NLP"""
-    query = request.args.get("query", "").strip()
-    limit = int(request.args.get("limit", 10))
-    language = request.args.get("language", None)
+_recommender = None
+_recommender_lock = threading.Lock()
 
-    if not query:
-        return jsonify(recommender._get_random_recommendations(limit, language))
 
-    try:
-        # Use search_movies_enhanced instead of trying to parse the query separately
-        results = recommender.search_movies_enhanced(query, limit, language)
-        return jsonify(results)
-    except Exception as e:
-        print(f"Error during search: {str(e)}")
-        return jsonify({"error": f"Search failed: {str(e)}"}), 500
+def get_recommender():
+    """Return the process-wide MovieRecommender, building it on first use"""
+    global _recommender
+    with _recommender_lock:
+        if _recommender is None:
+            _recommender = MovieRecommender()
+            if REFRESH_INTERVAL_HOURS > 0:
+                _recommender.start_periodic_refresh(REFRESH_INTERVAL_HOURS)
+        return _recommender
+
 
+def create_app():
+    """Create the Flask app serving the recommender API"""
+    app = Flask(__name__)
+    CORS(app, expose_headers=["X-Next-Cursor"])  # Enable CORS for all routes
+    recommender = get_recommender()
 
-@app.route("/api/recommend", methods=["GET"])
-def recommend():
-    """API endpoint for getting movie recommendations"""
-    movie_id = request.args.get("movie_id")
-    limit = int(request.args.get("limit", 10))
-    language = request.args.get("language", None)
+    def movies_response(ranked):
+        """JSON response of ranked movies, projected to the `fields` parameter"""
+        fields = parse_fields(request.args.get("fields"))
+        return app.response_class(
+            recommender.movies_json(ranked, fields), mimetype="application/json"
+        )
 
-    if not movie_id:
-        return jsonify({"error": "Movie ID is required"}), 400
+    @app.route("/")
+    def serve_frontend():
+        return send_from_directory("../frontend", "index.html")
 
-    recommendations = recommender.get_movie_recommendations(movie_id, limit, language)
-    return jsonify(recommendations)
+    @app.route("/<path:path>")
+    def serve_static(path):
+        return send_from_directory("../frontend", path)
 
+    @app.route("/api/trailer/<int:movie_id>", methods=["GET"])
+    def get_trailer(movie_id):
+        try:
+            key = recommender.get_trailer_key(movie_id)
+            if key is None:
+                return jsonify({"error": "Trailer not found"}), 404
+            return jsonify({"key": key})
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @app.route("/api/search", methods=["GET"])
+    def search_movies():
+        """API endpoint for searching movies with advanced NLP"""
+        query = request.args.get("query", "").strip()
+        limit = int(request.args.get("limit", 10))
+        language = request.args.get("language", None)
+        engine = request.args.get("engine", None)
+
+        if engine and engine not in SEARCH_ENGINES:
+            return jsonify({"error": f"engine must be one of {SEARCH_ENGINES}"}), 400
+        if not query:
+            return movies_response(recommender.rank_random(limit, language))
+
+        try:
+            # Use rank_search instead of trying to parse the query separately
+            ranked = recommender.rank_search(query, limit, language, engine)
+            return movies_response(ranked)
+        except Exception as e:
+            print(f"Error during search: {str(e)}")
+            return jsonify({"error": f"Search failed: {str(e)}"}), 500
+
+    @app.route("/api/search/batch", methods=["POST"])
+    def search_batch():
+        """API endpoint for running many searches in one request"""
+        payload = request.get_json(silent=True) or {}
+        if not isinstance(payload, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+        queries = payload.get("queries")
+        language = payload.get("language")
+        try:
+            limit = int(payload.get("limit", 10))
+        except (TypeError, ValueError):
+            return jsonify({"error": "limit must be an integer"}), 400
+
+        if language is not None and not isinstance(language, str):
+            return jsonify({"error": "language must be a string"}), 400
+        if not isinstance(queries, list) or not all(
+            isinstance(query, str) for query in queries
+        ):
+            return jsonify({"error": "queries must be a list of strings"}), 400
+        if len(queries) > SEARCH_BATCH_MAX_QUERIES:
+            return (
+                jsonify({"error": f"At most {SEARCH_BATCH_MAX_QUERIES} queries"}),
+                400,
+            )
 
-@app.route("/api/movie/<int:movie_id>", methods=["GET"])
-def get_movie(movie_id):
-    """API endpoint for getting details of a specific movie"""
-    for movie in recommender.movies:
-        if movie["id"] == movie_id:
+        try:
+            queries = [query.strip() for query in queries]
+            ranked = recommender.rank_search_many(queries, limit, language)
+            fields = parse_fields(payload.get("fields") or request.args.get("fields"))
+            body = ",".join(recommender.movies_json(r, fields) for r in ranked)
+            return app.response_class(f"[{body}]", mimetype="application/json")
+        except Exception as e:
+            print(f"Error during batch search: {str(e)}")
+            return jsonify({"error": f"Search failed: {str(e)}"}), 500
+
+    @app.route("/api/recommend", methods=["GET"])
+    def recommend():
+        """API endpoint for getting movie recommendations"""
+        movie_id = request.args.get("movie_id")
+        movie_ids = request.args.get("movie_ids")
+        limit = int(request.args.get("limit", 10))
+        language = request.args.get("language", None)
+        engine = request.args.get("engine", None)
+
+        if engine and engine not in SEARCH_ENGINES:
+            return jsonify({"error": f"engine must be one of {SEARCH_ENGINES}"}), 400
+
+        if movie_ids:
+            # "More like these": movie_ids=1,2,3 with optional weights=2,1,1
+            try:
+                movie_ids = [int(i) for i in movie_ids.split(",") if i.strip()]
+                weights = request.args.get("weights")
+                if weights:
+                    weights = [float(w) for w in weights.split(",")]
+            except ValueError:
+                return jsonify({"error": "Invalid movie_ids or weights"}), 400
+
+            ranked = recommender.rank_for_movies(
+                movie_ids, limit, language, weights or None
+            )
+            if isinstance(ranked, dict):
+                return jsonify(ranked), 400
+            return movies_response(ranked)
+
+        if not movie_id:
+            return jsonify({"error": "Movie ID is required"}), 400
+
+        ranked = recommender.rank_recommendations(movie_id, limit, language, engine)
+        if isinstance(ranked, dict):
+            return jsonify(ranked)
+        return movies_response(ranked)
+
+    @app.route("/api/movie/<int:movie_id>", methods=["GET"])
+    def get_movie(movie_id):
+        """API endpoint for getting details of a specific movie"""
+        movie = recommender.get_movie(movie_id)
+        if movie:
             return jsonify(movie)
 
-    return jsonify({"error": "Movie not found"}), 404
+        return jsonify({"error": "Movie not found"}), 404
 
+    @app.route("/api/random", methods=["GET"])
+    def random_movies():
+        """
+        API endpoint for browsing movies in a random order. Pass the
+        X-Next-Cursor header of a page as `cursor` to get the next page.
+        """
+        limit = int(request.args.get("limit", 10))
+        language = request.args.get("language", None)
+        cursor = request.args.get("cursor", None)
+
+        try:
+            rows, scores, next_cursor = recommender.browse(limit, language, cursor)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-@app.route("/api/random", methods=["GET"])
-def random_movies():
-    """API endpoint for getting random movies"""
-    limit = int(request.args.get("limit", 10))
-    language = request.args.get("language", None)
+        response = movies_response((rows, scores))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return response
 
-    random_selections = recommender._get_random_recommendations(limit, language)
-    return jsonify(random_selections)
+    @app.route("/api/cache/stats", methods=["GET"])
+    def cache_stats():
+        """API endpoint for cache hit/miss/eviction counters"""
+        return jsonify(recommender.cache_stats())
 
+    @app.route("/api/languages", methods=["GET"])
+    def get_languages():
+        """API endpoint for getting available languages"""
+        languages = {"en": "English (Hollywood)", "hi": "Hindi (Bollywood)"}
+        return jsonify(languages)
 
-@app.route("/api/languages", methods=["GET"])
-def get_languages():
-    """API endpoint for getting available languages"""
-    languages = {"en": "English (Hollywood)", "hi": "Hindi (Bollywood)"}
-    return jsonify(languages)
+    return app
 
 
 if __name__ == "__main__":
-    app.run(debug=false, port=5500)
+    if sys.argv[1:] == ["refresh"]:
+        # One-off delta refresh: python optimized_movie_recommender.py refresh
+        get_recommender().refresh_changed_movies()
+    elif sys.argv[1:] == ["ann-report"]:
+        # IVF recall/latency: python optimized_movie_recommender.py ann-report
+        recommender = get_recommender()
+        rebuild = recommender._rebuild_thread
+        if rebuild is not None:
+            rebuild.join()  # The ANN index is built in the background
+        print(json.dumps(recommender.ann_recall_report(), indent=2))
+    else:
+        create_app().run(debug=False, port=5500)
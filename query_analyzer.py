@@ -0,0 +1,228 @@
+import re
+from collections import namedtuple
+
+from text_preprocessing import preprocess_text
+
+# Common misspellings in movie searches
+CORRECTIONS = {
+    "marvle": "marvel",
+    "starwars": "star wars",
+    "harry poter": "harry potter",
+    "jurrasic": "jurassic",
+    "batmen": "batman",
+    "lordoftherings": "lord of the rings",
+    "pirates of caribean": "pirates of caribbean",
+    "fast and furios": "fast and furious",
+    "avengrs": "avengers",
+}
+
+# Genres recognized in queries, in priority order
+GENRES = [
+    "action",
+    "adventure",
+    "animation",
+    "comedy",
+    "crime",
+    "documentary",
+    "drama",
+    "family",
+    "fantasy",
+    "history",
+    "horror",
+    "music",
+    "mystery",
+    "romance",
+    "science fiction",
+    "sci-fi",
+    "thriller",
+    "war",
+    "western",
+]
+
+# Phrases that signal each mood, in priority order
+MOOD_PHRASES = {
+    "happy": ["happy", "feel good", "feel-good", "uplifting", "light hearted"],
+    "sad": ["sad", "tearjerker", "heartbreaking", "melancholy"],
+    "scary": ["scary", "frightening", "creepy", "horror", "terrifying"],
+    "tense": ["tense", "suspenseful", "thriller", "anxiety"],
+    "funny": ["funny", "hilarious", "comedy", "laugh"],
+    "inspirational": ["inspirational", "motivational", "inspiring"],
+    "romantic": ["romantic", "romance", "love story"],
+    "thought-provoking": [
+        "thought provoking",
+        "philosophical",
+        "deep",
+        "intellectual",
+    ],
+}
+
+# Leading phrases that carry no search meaning
+SEARCH_PREFIXES = [
+    "show me",
+    "find",
+    "recommend",
+    "suggest",
+    "i want to watch",
+    "i want to see",
+    "i'm looking for",
+    "i am looking for",
+]
+
+# Query terms (matched as substrings) and the synonyms appended for them
+EXPANSIONS = {
+    "scary": ["horror", "thriller", "suspense"],
+    "kids": ["family", "animation", "disney", "pixar"],
+    "sad": ["drama", "tragedy"],
+    "superhero": ["marvel", "dc", "comic", "avengers"],
+    "funny": ["comedy", "humor", "laugh"],
+    "space": ["sci-fi", "science fiction", "alien"],
+    "war": ["battle", "military", "army", "soldier"],
+}
+
+ParsedQuery = namedtuple(
+    "ParsedQuery",
+    [
+        "original",  # Query as received
+        "corrected",  # After spelling correction
+        "genre",
+        "mood",
+        "actor",
+        "decade",
+        "expanded",  # Corrected query plus synonym expansions
+        "processed",  # Tokenized/lemmatized text to vectorize
+        "cache_key",  # Normalized form for result caching
+    ],
+)
+
+
+def _alternation(phrases):
+    """Regex alternation of literal phrases, longest first"""
+    return "|".join(re.escape(p) for p in sorted(phrases, key=len, reverse=True))
+
+
+class QueryAnalyzer:
+    """
+    Parses a search query into a ParsedQuery. All rule tables are compiled
+    once. Corrections, genres and moods are matched with one combined regex
+    each; actor and decade phrases and search prefixes are tried pattern by
+    pattern, since a query can hold several of them and the earlier
+    pattern wins.
+    """
+
+    def __init__(self):
+        self._corrections = re.compile(
+            rf"\b(?:{_alternation(CORRECTIONS)})\b", re.IGNORECASE
+        )
+
+        self._genre_priority = {genre: i for i, genre in enumerate(GENRES)}
+        self._genres = re.compile(rf"\b(?:{_alternation(GENRES)})\b")
+
+        self._mood_of_phrase = {}
+        mood_priority = {}
+        for i, (mood, phrases) in enumerate(MOOD_PHRASES.items()):
+            mood_priority[mood] = i
+            for phrase in phrases:
+                self._mood_of_phrase.setdefault(phrase, mood)
+        self._mood_priority = mood_priority
+        self._moods = re.compile(rf"\b(?:{_alternation(self._mood_of_phrase)})\b")
+
+        name = r"[A-Z][a-z]+\s+[A-Z][a-z]+"
+        self._actor_patterns = [
+            re.compile(rf"with\s+({name})"),  # "with Tom Hanks"
+            re.compile(rf"starring\s+({name})"),  # "starring Brad Pitt"
+            re.compile(rf"({name})\s+movies"),  # "Leonardo DiCaprio movies"
+        ]
+
+        self._decade_patterns = [
+            re.compile(r"(\d0)s\s+(?:movies|films)"),  # "90s movies"
+            re.compile(r"(\d{3}0)s\s+(?:movies|films)"),  # "1990s movies"
+            # "movies from the 80's", "movies from the 1980's"
+            re.compile(r"(?:movies|films)\s+from\s+the\s+(\d0)(?:'s|s)"),
+            re.compile(r"(?:movies|films)\s+from\s+the\s+(\d{3}0)(?:'s|s)"),
+        ]
+
+        # Each prefix is stripped in turn, so "show me" then "find" both go
+        self._prefixes = [
+            re.compile(rf"^{re.escape(prefix)}\s+", re.IGNORECASE)
+            for prefix in SEARCH_PREFIXES
+        ]
+        self._expansions = re.compile(_alternation(EXPANSIONS))
+        self._punctuation = re.compile(r"[^\w\s]")
+
+    def analyze(self, query):
+        """Parse a raw query into a ParsedQuery"""
+        corrected = self._corrections.sub(
+            lambda m: CORRECTIONS[m.group(0).lower()], query
+        )
+        lowered = corrected.lower()
+
+        cleaned = self._strip_prefixes(corrected)
+        actor = self._first_actor(corrected)
+        expanded = self._expand(corrected, lowered)
+        processed = preprocess_text(
+            self._punctuation.sub("", self._strip_prefixes(expanded).lower())
+        )
+
+        return ParsedQuery(
+            original=query,
+            corrected=corrected,
+            genre=self._first_by_priority(
+                self._genres, lowered, self._genre_priority, lambda g: g
+            ),
+            mood=self._first_by_priority(
+                self._moods,
+                lowered,
+                self._mood_priority,
+                lambda phrase: self._mood_of_phrase[phrase],
+            ),
+            actor=actor,
+            decade=self._first_decade(lowered),
+            expanded=expanded,
+            processed=processed,
+            cache_key=(" ".join(cleaned.lower().split()), actor),
+        )
+
+    @staticmethod
+    def _first_by_priority(pattern, text, priority, label_of):
+        """Of all labels matched in text, return the highest-priority one"""
+        labels = {label_of(m.group(0)) for m in pattern.finditer(text)}
+        return min(labels, key=priority.__getitem__) if labels else None
+
+    def _strip_prefixes(self, query):
+        """Remove leading phrases such as 'show me' or 'recommend', in order"""
+        for prefix in self._prefixes:
+            query = prefix.sub("", query)
+        return query
+
+    def _first_actor(self, query):
+        """Actor name from "with X", "starring X" or "X movies" (case sensitive)"""
+        for pattern in self._actor_patterns:
+            match = pattern.search(query)
+            if match:
+                return match.group(1)
+        return None
+
+    def _first_decade(self, lowered):
+        """Decade from "90s movies" / "films from the 1980's" style phrases"""
+        for pattern in self._decade_patterns:
+            match = pattern.search(lowered)
+            if match:
+                decade = match.group(1)
+                # Convert to full decade (80 -> 1980, 10 -> 2010)
+                if len(decade) == 2:
+                    decade = ("20" if int(decade) <= 20 else "19") + decade
+                return int(decade)
+        return None
+
+    def _expand(self, query, lowered):
+        """Append synonyms for every expansion term found in the query"""
+        found = {m.group(0) for m in self._expansions.finditer(lowered)}
+        if not found:
+            return query
+        expanded_terms = [
+            synonym
+            for term, synonyms in EXPANSIONS.items()
+            if term in found
+            for synonym in synonyms
+        ]
+        return f"{query} {' '.join(expanded_terms)}"
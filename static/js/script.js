@@ -9,6 +9,7 @@
 let currentMovieId = null;
 let currentLanguage = null;
 let currentPage = 1;
+let browseCursor = null; // Cursor for the next browse page, null once all are shown
 const moviesPerPage = 12;
 let isLoading = false; // Flag to prevent multiple simultaneous loading requests
 let lastSearchQuery = ''; // Track last search query
@@ -440,8 +441,13 @@ document.addEventListener('DOMContentLoaded', function() {
         // Hide recommendations when loading random movies
         recommendationsSection.style.display = 'none';
         
-        fetch(`/api/random?limit=${limit}&language=${language || ''}&page=${currentPage}`)
-            .then(handleResponse)
+        // Starts a new browse session; each page hands out the next page's cursor
+        browseCursor = null;
+        fetch(`/api/random?limit=${limit}&language=${language || ''}`)
+            .then(response => {
+                browseCursor = response.headers.get('X-Next-Cursor');
+                return handleResponse(response);
+            })
             .then(movies => {
                 displayMovies(movies, movieResults, false);
                 isLoading = false;
@@ -460,6 +466,10 @@ document.addEventListener('DOMContentLoaded', function() {
         // Don't load more if we're already loading
         if (isLoading) return;
         
+        // Browsing has shown every movie once the server stops sending cursors
+        const query = searchInput.value.trim();
+        if (!query && !browseCursor) return;
+        
         isLoading = true;
         
         // Create a loading indicator at the bottom
@@ -478,18 +488,22 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Determine which API to call based on current view
         let apiUrl;
-        const query = searchInput.value.trim();
         
         if (query) {
             // We're in search view
             apiUrl = `/api/search?query=${encodeURIComponent(query)}&limit=${moviesPerPage}&language=${currentLanguage || ''}&page=${currentPage}`;
         } else {
             // We're in random/browse view
-            apiUrl = `/api/random?limit=${moviesPerPage}&language=${currentLanguage || ''}&page=${currentPage}`;
+            apiUrl = `/api/random?limit=${moviesPerPage}&cursor=${encodeURIComponent(browseCursor)}`;
         }
         
         fetch(apiUrl)
-            .then(handleResponse)
+            .then(response => {
+                if (!query && response.ok) {
+                    browseCursor = response.headers.get('X-Next-Cursor');
+                }
+                return handleResponse(response);
+            })
             .then(movies => {
                 // Remove the loading indicator
                 const indicator = document.querySelector('.load-more-indicator');
@@ -499,7 +513,8 @@ document.addEventListener('DOMContentLoaded', function() {
                 
                 if (movies && movies.length > 0) {
                     displayMovies(movies, movieResults, true);
-                } else {
+                }
+                if (!movies || movies.length === 0 || (!query && !browseCursor)) {
                     // No more movies to load, show "end of results" message
                     const endMessage = document.createElement('div');
                     endMessage.className = 'col-12 text-center py-3';
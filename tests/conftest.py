@@ -0,0 +1,87 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import optimized_movie_recommender as omr  # noqa: E402
+import text_preprocessing  # noqa: E402
+from tmdb_client import TMDBClient, TokenBucket  # noqa: E402
+from tmdb_stub import TMDBStub  # noqa: E402
+
+
+def simple_preprocess(text):
+    """Stand-in for NLTK preprocessing, so tests need no corpus downloads"""
+    return " ".join(token for token in text.lower().split() if token.isalpha())
+
+
+def dataset_movie(movie_id, language="en", title=None):
+    """A normalized movie record, as ingestion stores it"""
+    title = title or f"Movie {movie_id}"
+    return {
+        "id": movie_id,
+        "title": title,
+        "original_title": title,
+        "overview": "A robot crosses space to find love",
+        "release_date": "2001-01-01",
+        "genres": ["Action"],
+        "director": "Director D",
+        "cast": ["Actor A"],
+        "keywords": ["robot"],
+        "language": language,
+        "document": f"{title} robot space love action",
+        "poster_path": f"/{movie_id}.jpg",
+        "vote_average": 7.0,
+        "runtime": 100,
+    }
+
+
+@pytest.fixture
+def tmdb_stub():
+    stub = TMDBStub()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def make_recommender(monkeypatch, tmp_path, tmdb_stub):
+    """
+    Build MovieRecommenders in a temporary directory, talking to the TMDB
+    stand-in without rate limiting or retry delays. Pass `movies` to start
+    from a stored dataset instead of a crawl. Background enrichment and
+    index rebuilds are waited for before the next recommender is built (a
+    server process has only one) and before the directory is left.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(omr, "TMDB_BASE_URL", tmdb_stub.base_url)
+    monkeypatch.setattr(omr.MovieRecommender, "_load_api_key", lambda self: "key")
+    monkeypatch.setattr(omr, "ensure_nltk_resources", lambda: None)
+    monkeypatch.setattr(text_preprocessing, "preprocess_text", simple_preprocess)
+    monkeypatch.setattr(TokenBucket, "acquire", lambda self: None)
+    monkeypatch.setattr(TMDBClient, "_backoff", staticmethod(lambda attempt: 0))
+
+    built = []
+
+    def settle():
+        for recommender in built:
+            # Enrichment may start a rebuild, so it is waited for first
+            for name in ("_enrich_thread", "_rebuild_thread"):
+                thread = getattr(recommender, name)
+                if thread is not None:
+                    thread.join()
+
+    def make(movies=None, hollywood=0, bollywood=0):
+        settle()
+        if movies is not None:
+            with open(omr.LEGACY_DATA_FILE, "w", encoding="utf-8") as f:
+                json.dump(movies, f)
+        monkeypatch.setattr(omr, "HOLLYWOOD_COUNT", hollywood)
+        monkeypatch.setattr(omr, "BOLLYWOOD_COUNT", bollywood)
+        monkeypatch.setattr(omr, "TARGET_MOVIE_COUNT", hollywood + bollywood)
+        built.append(omr.MovieRecommender())
+        return built[-1]
+
+    yield make
+    settle()
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from ann_index import IVFIndex
+from optimized_movie_recommender import ANN_CANDIDATE_FACTOR, ANN_PROBE
+
+TOPICS = 40
+WORDS_PER_TOPIC = 30
+DOCS = 5000
+K = 10
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    """
+    TF-IDF rows of documents drawn from overlapping topics (each mostly its
+    own words plus some shared ones), as movie documents cluster by genre
+    and cast; and a two-language split of the rows
+    """
+    rng = np.random.default_rng(0)
+    shared = [f"common{i}" for i in range(200)]
+    docs = []
+    for _ in range(DOCS):
+        topic = rng.integers(TOPICS)
+        own = [f"t{topic}w{i}" for i in rng.integers(WORDS_PER_TOPIC, size=12)]
+        docs.append(" ".join(own + list(rng.choice(shared, 4))))
+    matrix = TfidfVectorizer().fit_transform(docs).tocsr()
+    languages = np.where(rng.random(DOCS) < 0.3, "hi", "en")
+    return matrix, {language: languages == language for language in ("en", "hi")}
+
+
+@pytest.fixture(scope="module")
+def index(corpus):
+    matrix, masks = corpus
+    return IVFIndex.build(matrix, groups=masks)
+
+
+def exact_top_k(matrix, row, rows=None):
+    scores = (matrix @ matrix[row].T).toarray().ravel()
+    scores[row] = -np.inf
+    if rows is not None:
+        allowed = np.zeros(len(scores), dtype=bool)
+        allowed[rows] = True
+        scores[~allowed] = -np.inf
+    return np.argsort(-scores, kind="stable")[:K]
+
+
+def ann_top_k(matrix, index, row, group=None):
+    candidates = index.candidates(
+        matrix[row], ANN_PROBE, K * ANN_CANDIDATE_FACTOR, group
+    )
+    candidates = candidates[candidates != row]
+    scores = (matrix[candidates] @ matrix[row].T).toarray().ravel()
+    return candidates[np.argsort(-scores, kind="stable")[:K]]
+
+
+def recall(matrix, index, queries, group=None, mask=None):
+    rows = None if mask is None else np.flatnonzero(mask)
+    found = sum(
+        len(
+            np.intersect1d(
+                exact_top_k(matrix, row, rows), ann_top_k(matrix, index, row, group)
+            )
+        )
+        for row in queries
+    )
+    return found / (K * len(queries))
+
+
+def test_recall_at_k(corpus, index):
+    matrix, _ = corpus
+    queries = np.random.default_rng(1).choice(DOCS, 200, replace=False)
+    assert recall(matrix, index, queries) >= 0.95
+
+
+def test_group_recall_at_k(corpus, index):
+    matrix, masks = corpus
+    rows = np.flatnonzero(masks["hi"])
+    queries = np.random.default_rng(2).choice(rows, 100, replace=False)
+    assert recall(matrix, index, queries, "hi", masks["hi"]) >= 0.95
+
+
+def test_group_candidates_stay_in_group(corpus, index):
+    matrix, masks = corpus
+    for group, mask in masks.items():
+        candidates = index.candidates(matrix[0], ANN_PROBE, 500, group)
+        assert mask[candidates].all()
+        assert len(candidates) >= 500
+        assert len(np.unique(candidates)) == len(candidates)
+
+
+def test_posting_lists_cover_every_row_once(corpus, index):
+    _, masks = corpus
+    order, offsets = index.lists[None]
+    assert np.array_equal(np.sort(order), np.arange(DOCS))
+    assert offsets[-1] == DOCS
+    for group, mask in masks.items():
+        order, _ = index.lists[group]
+        assert np.array_equal(np.sort(order), np.flatnonzero(mask))
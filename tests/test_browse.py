@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import optimized_movie_recommender as omr
+from conftest import dataset_movie
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 17, 64, 1000, 4097])
+def test_browse_positions_are_a_permutation(count):
+    positions = omr._browse_positions(7, count, np.arange(count))
+    assert np.array_equal(np.sort(positions), np.arange(count))
+
+
+def test_browse_positions_depend_on_seed_only():
+    first = omr._browse_positions(1, 500, np.arange(500))
+    page = omr._browse_positions(1, 500, np.arange(100, 110))
+    assert np.array_equal(first[100:110], page)
+    assert not np.array_equal(first, omr._browse_positions(2, 500, np.arange(500)))
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        [-1, 10, 0, None],
+        [2**64, 10, 0, None],
+        [True, 10, 0, None],
+        [1, True, 0, None],
+        [1, 10, False, None],
+        [1, 10, 11, None],
+        [1, 2**64, 0, None],
+        [1.5, 10, 0, None],
+        [1, 10, 0, 3],
+    ],
+)
+def test_forged_cursors_are_rejected(fields):
+    with pytest.raises(ValueError):
+        omr._decode_cursor(omr._encode_cursor(*fields))
+
+
+def test_browse_pages_through_every_movie_once(make_recommender):
+    movies = [dataset_movie(i, "hi" if i % 3 == 0 else "en") for i in range(1, 50)]
+    recommender = make_recommender(movies)
+
+    for language in (None, "hi"):
+        seen, cursor = [], None
+        while True:
+            rows, _, cursor = recommender.browse(7, language, cursor)
+            seen += rows.tolist()
+            if cursor is None:
+                break
+        expected = [
+            row
+            for row, movie in enumerate(movies)
+            if language is None or movie["language"] == language
+        ]
+        assert sorted(seen) == expected
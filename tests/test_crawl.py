@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+
+import optimized_movie_recommender as omr
+from crawl_frontier import CrawlFrontier
+from conftest import dataset_movie
+from tmdb_stub import movie_details
+
+HINDI_LIST = "discover/movie?sort_by=popularity.desc&with_original_language=hi"
+
+
+def test_frontier_serves_the_most_productive_source_first():
+    a, b, c = (omr.CrawlSource(label, "hollywood", label, pages=2) for label in "abc")
+    frontier = CrawlFrontier([a, b, c])
+    tasks = frontier.tasks()
+
+    # Untried sources share the prior and keep their declared order
+    assert next(tasks) == (a, 1)
+    frontier.record(a, 1, results=20, useful=0)
+    assert next(tasks) == (b, 1)
+    # A source that found new movies moves ahead of untried ones
+    frontier.record(b, 1, results=20, useful=20)
+    assert next(tasks) == (b, 2)
+    frontier.record(b, 2, results=20, useful=20)
+    assert next(tasks) == (c, 1)
+    # A known page count ends the source before its `pages` limit
+    frontier.record(c, 1, results=20, useful=20, total_pages=1)
+    assert next(tasks) == (a, 2)
+    frontier.record(a, 2)
+    assert list(tasks) == []
+
+
+def test_frontier_drops_sources_no_longer_wanted():
+    a, b = (omr.CrawlSource(label, label, label, pages=5) for label in "ab")
+    frontier = CrawlFrontier([a, b], wanted=lambda source: source is not a)
+    tasks = frontier.tasks()
+
+    assert next(tasks) == (b, 1)
+    frontier.record(b, 1, results=20, useful=20, total_pages=1)
+    assert list(tasks) == []
+
+
+def test_category_count_follows_dataset_changes(make_recommender):
+    recommender = make_recommender(
+        [dataset_movie(1), dataset_movie(2, "hi"), dataset_movie(3)]
+    )
+    assert recommender._category_count("hollywood") == 2
+    assert recommender._category_count("bollywood") == 1
+
+    assert recommender._add_movie(dataset_movie(4, "hi"))
+    assert not recommender._add_movie(dataset_movie(4, "hi"))
+    assert recommender._category_count("bollywood") == 2
+
+    recommender._upsert_movie(dataset_movie(1, "hi"))
+    assert recommender._category_count("hollywood") == 1
+    assert recommender._category_count("bollywood") == 3
+
+
+def test_crawl_stops_at_quotas(make_recommender, tmdb_stub):
+    tmdb_stub.add_list("movie/popular", [movie_details(i) for i in range(1, 201)])
+    tmdb_stub.add_list(HINDI_LIST, [movie_details(i, "hi") for i in range(1001, 1101)])
+
+    recommender = make_recommender(hollywood=30, bollywood=10)
+
+    assert recommender._category_count("hollywood") == 30
+    assert recommender._category_count("bollywood") == 10
+    assert len(recommender.movies) == 40
+    # Each list is crawled only until its quota is met, not for all its pages
+    assert len(tmdb_stub.requested("movie/popular")) < 10
+    hindi_pages = [
+        params
+        for params in tmdb_stub.requested("discover/movie")
+        if params.get("with_original_language") == "hi"
+    ]
+    assert 1 <= len(hindi_pages) < 5
+
+
+@pytest.mark.parametrize("tiered", [True, False])
+def test_crawl_ends_when_a_quota_fills_and_the_other_cannot(
+    make_recommender, tmdb_stub, monkeypatch, tiered
+):
+    monkeypatch.setattr(omr, "TIERED_INGESTION", tiered)
+    tmdb_stub.add_list("movie/popular", [movie_details(i) for i in range(1, 2001)])
+    tmdb_stub.add_list(HINDI_LIST, [movie_details(i, "hi") for i in range(3001, 3011)])
+
+    # Pages of the filled category may still be queued or in flight; they
+    # must be dropped and recorded so the crawl ends when the Hindi list does
+    built = []
+    crawl = threading.Thread(
+        target=lambda: built.append(make_recommender(hollywood=5, bollywood=300)),
+        daemon=True,
+    )
+    crawl.start()
+    crawl.join(60)
+
+    assert not crawl.is_alive(), "crawl did not finish"
+    recommender = built[0]
+    assert recommender._category_count("hollywood") == 5
+    assert recommender._category_count("bollywood") == 10
@@ -0,0 +1,34 @@
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+import index_snapshot
+from index_snapshot import load_arrays, save_arrays, save_snapshot
+
+
+def snapshot(directory, fingerprint, docs):
+    vectorizer = TfidfVectorizer()
+    save_snapshot(directory, fingerprint, vectorizer, vectorizer.fit_transform(docs), 1)
+
+
+def test_arrays_load_only_for_their_fingerprint(tmp_path):
+    directory = str(tmp_path / "snapshot")
+    snapshot(directory, "a", ["robot space", "love story"])
+    assert save_arrays(directory, "a", "features", "key", {"rows": np.arange(2)})
+
+    arrays, _ = load_arrays(directory, "a", "features", "key")
+    assert np.array_equal(arrays["rows"], np.arange(2))
+    assert load_arrays(directory, "a", "features", "other key") is None
+
+
+def test_arrays_of_a_replaced_snapshot_are_not_loaded(tmp_path, monkeypatch):
+    directory = str(tmp_path / "snapshot")
+    snapshot(directory, "b", ["robot space", "love story", "ghost house"])
+
+    # A worker built its group from snapshot "a" and checked the snapshot
+    # before another worker replaced it with "b"
+    read_meta = index_snapshot._read_meta
+    monkeypatch.setattr(index_snapshot, "_read_meta", lambda *args: {})
+    save_arrays(directory, "a", "features", "key", {"rows": np.arange(2)})
+    monkeypatch.setattr(index_snapshot, "_read_meta", read_meta)
+
+    assert load_arrays(directory, "b", "features", "key") is None
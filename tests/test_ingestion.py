@@ -0,0 +1,130 @@
+import itertools
+import threading
+import time
+
+import optimized_movie_recommender as omr
+from conftest import dataset_movie
+from ingest_pipeline import Pipeline
+from tmdb_stub import movie_details
+
+HINDI_LIST = "discover/movie?sort_by=popularity.desc&with_original_language=hi"
+
+
+def test_concurrent_detail_fetches_share_one_request(make_recommender, tmdb_stub):
+    recommender = make_recommender([dataset_movie(1)])
+    tmdb_stub.details[7] = {"id": 7}
+    calls = []
+    get = recommender.tmdb.get
+
+    def slow_get(*args, **kwargs):
+        calls.append(args)
+        time.sleep(0.2)
+        return get(*args, **kwargs)
+
+    recommender.tmdb.get = slow_get
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(recommender._fetch_details_response(7))
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"id": 7}] * 4
+    assert recommender.cache_stats()["details"]["coalesced"] == 3
+
+
+def test_enrichment_fills_list_level_movies_and_reindexes_once(
+    make_recommender, tmdb_stub, monkeypatch
+):
+    english = [movie_details(i) for i in range(1, 4)]
+    english[0]["credits"]["cast"] = [{"name": "Zorblax Quint"}]
+    tmdb_stub.add_list("movie/popular", english)
+    tmdb_stub.add_list(HINDI_LIST, [movie_details(i, "hi") for i in (11, 12)])
+    monkeypatch.setattr(omr, "TIERED_INGESTION", True)
+    monkeypatch.setattr(omr, "ENRICH_BATCH", 1)
+    # Enrichment is run by the test instead of in the background
+    monkeypatch.setattr(omr.MovieRecommender, "_start_enrichment", lambda self: None)
+    recommender = make_recommender(hollywood=3, bollywood=2)
+    assert all(movie["cast"] == [] for movie in recommender.movies)
+    version = recommender._dataset_version
+
+    assert recommender._enrich_movies() == 5
+    # One index rebuild for the whole run, not one per batch
+    assert recommender._dataset_version == version + 1
+
+    for movie in recommender.movies:
+        assert movie["cast"] and movie["director"] == "Director D"
+        assert movie["keywords"] == ["robot"]
+        assert movie.get("enriched", True)
+        bollywood = movie["document"].endswith(omr.BOLLYWOOD_TAGS)
+        assert bollywood == (movie["language"] == "hi")
+    assert recommender._enrich_movies() == 0
+
+    thread = recommender._rebuild_thread
+    if thread is not None:
+        thread.join()
+    # Searchable by cast once the rebuilt index is live
+    tfidf = recommender._tfidf
+    query = tfidf.vectorizer.transform(["zorblax"])
+    rows, _ = recommender._rank_partitions(tfidf, query, 3)
+    assert recommender.movies[rows[0]]["id"] == 1
+
+
+def test_pipeline_runs_every_task_through_every_stage():
+    pipeline = Pipeline(
+        [
+            ("double", lambda n: [n, n], 3),
+            ("square", lambda n: [n * n], 2),
+        ],
+        queue_size=2,
+    )
+    written = []
+    pipeline.run(range(10), written.append)
+
+    assert sorted(written) == sorted(2 * [n * n for n in range(10)])
+    assert pipeline.processed == {"double": 10, "square": 20}
+
+
+def test_pipeline_without_tasks_finishes():
+    pipeline = Pipeline([("stage", lambda n: [n], 4)])
+    written = []
+    pipeline.run(iter(()), written.append)
+    assert written == []
+
+
+def test_pipeline_keeps_going_after_a_failing_item():
+    def stage(n):
+        if n == 3:
+            raise ValueError("bad item")
+        yield n
+
+    pipeline = Pipeline([("stage", stage, 2)])
+    written = []
+    pipeline.run(range(6), written.append)
+    assert sorted(written) == [0, 1, 2, 4, 5]
+
+
+def test_pipeline_stop_from_sink_cancels_endless_tasks():
+    pipeline = Pipeline([("endless", lambda n: [n], 2)], queue_size=1)
+    written = []
+
+    def sink(n):
+        written.append(n)
+        if len(written) == 5:
+            pipeline.stop()
+
+    pipeline.run(itertools.count(), sink)
+
+    assert pipeline.stopped
+    assert len(written) == 5
+    assert not [
+        thread
+        for thread in threading.enumerate()
+        if thread.name.startswith("pipeline-endless-")
+    ]
@@ -0,0 +1,116 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import optimized_movie_recommender as omr
+from conftest import dataset_movie
+from tmdb_stub import movie_details
+
+
+def write_last_sync(synced_at):
+    with open(omr.SYNC_STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump({"last_sync": synced_at.isoformat()}, f)
+
+
+def read_last_sync():
+    with open(omr.SYNC_STATE_FILE, encoding="utf-8") as f:
+        return datetime.fromisoformat(json.load(f)["last_sync"])
+
+
+def test_refresh_walks_change_windows_and_upserts(make_recommender, tmdb_stub):
+    recommender = make_recommender([dataset_movie(i) for i in range(1, 11)])
+    now = datetime.now(timezone.utc)
+    since = now - timedelta(days=30)
+    write_last_sync(since)
+
+    day = lambda days_ago: (now - timedelta(days=days_ago)).strftime("%Y-%m-%d")
+    tmdb_stub.changes = [(day(25), 2), (day(10), 3), (day(1), 999)]
+    tmdb_stub.details[2] = movie_details(2, title="Renamed Two")
+    tmdb_stub.details[3] = movie_details(3, language="hi", title="Renamed Three")
+
+    assert recommender.refresh_changed_movies() == 2
+
+    # Contiguous windows of at most CHANGES_WINDOW_DAYS from the last sync on
+    windows = [
+        (params["start_date"], params["end_date"])
+        for params in tmdb_stub.requested("movie/changes")
+    ]
+    assert windows[0][0] == since.strftime("%Y-%m-%d")
+    assert windows[-1][1] == now.strftime("%Y-%m-%d")
+    for (start, end), (next_start, _) in zip(windows, windows[1:]):
+        assert end == next_start
+    for start, end in windows:
+        span = datetime.fromisoformat(end) - datetime.fromisoformat(start)
+        assert span <= timedelta(days=omr.CHANGES_WINDOW_DAYS)
+    assert len(windows) == 3
+
+    # Only changed movies already in the dataset are re-fetched
+    fetched = {endpoint for endpoint, _ in tmdb_stub.requests}
+    assert {"movie/2", "movie/3"} <= fetched
+    assert "movie/999" not in fetched
+    assert recommender.get_movie(2)["title"] == "Renamed Two"
+    assert recommender.get_movie(3)["language"] == "hi"
+    assert recommender.get_movie(999) is None
+    assert recommender._category_count("bollywood") == 1
+
+    # The sync state moves to the start of this refresh, in UTC
+    synced_at = read_last_sync()
+    assert synced_at.tzinfo is not None
+    assert now <= synced_at <= datetime.now(timezone.utc)
+
+    # Upserts are persisted
+    reloaded = make_recommender()
+    assert reloaded.get_movie(2)["title"] == "Renamed Two"
+
+
+def test_refresh_without_sync_state_looks_back_one_window(make_recommender, tmdb_stub):
+    recommender = make_recommender([dataset_movie(1)])
+
+    assert recommender.refresh_changed_movies() == 0
+
+    windows = tmdb_stub.requested("movie/changes")
+    assert len(windows) == 1
+    start = datetime.fromisoformat(windows[0]["start_date"])
+    end = datetime.fromisoformat(windows[0]["end_date"])
+    assert end - start == timedelta(days=omr.CHANGES_WINDOW_DAYS)
+    assert read_last_sync().tzinfo is not None
+
+
+def test_refresh_reads_naive_sync_state_as_utc(make_recommender, tmdb_stub):
+    recommender = make_recommender([dataset_movie(1)])
+    since = datetime.now(timezone.utc) - timedelta(days=3)
+    write_last_sync(since.replace(tzinfo=None))
+
+    assert recommender.refresh_changed_movies() == 0
+    (window,) = tmdb_stub.requested("movie/changes")
+    assert window["start_date"] == since.strftime("%Y-%m-%d")
+
+
+def test_refresh_keeps_sync_state_when_change_feed_fails(make_recommender, tmdb_stub):
+    recommender = make_recommender([dataset_movie(1)])
+    since = datetime.now(timezone.utc) - timedelta(days=3)
+    write_last_sync(since)
+    tmdb_stub.fail.add("movie/changes")
+
+    assert recommender.refresh_changed_movies() == 0
+    assert read_last_sync() == since
+
+
+def test_refresh_retries_movies_whose_refetch_failed(make_recommender, tmdb_stub):
+    recommender = make_recommender([dataset_movie(1), dataset_movie(2)])
+    now = datetime.now(timezone.utc)
+    write_last_sync(now - timedelta(days=3))
+    tmdb_stub.changes = [((now - timedelta(days=1)).strftime("%Y-%m-%d"), 2)]
+    tmdb_stub.details[2] = movie_details(2, title="Renamed Two")
+    tmdb_stub.fail.add("movie/2")
+
+    assert recommender.refresh_changed_movies() == 0
+    assert recommender.get_movie(2)["title"] == "Movie 2"
+
+    # The change feed no longer lists the movie, but the failed id is kept
+    tmdb_stub.fail.clear()
+    tmdb_stub.changes = []
+    assert recommender.refresh_changed_movies() == 1
+    assert recommender.get_movie(2)["title"] == "Renamed Two"
+
+    with open(omr.SYNC_STATE_FILE, encoding="utf-8") as f:
+        assert json.load(f)["pending"] == []
@@ -0,0 +1,57 @@
+import time
+
+from conftest import dataset_movie
+from tmdb_client import ResponseCache
+
+
+def test_prune_deletes_only_expired_entries(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+    cache.put("old", {"n": 1})
+    cache.put("new", {"n": 2})
+    cache._db.execute(
+        "UPDATE responses SET fetched_at = ? WHERE key = 'old'", (time.time() - 100,)
+    )
+    cache._db.commit()
+
+    assert cache.prune(50) == 1
+    assert cache.get("old", 1000) is None
+    assert cache.get("new", 1000) == {"n": 2}
+
+
+def test_retention_prunes_on_open(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResponseCache(path)
+    cache.put("old", {"n": 1})
+    cache._db.execute("UPDATE responses SET fetched_at = ?", (time.time() - 100,))
+    cache._db.commit()
+
+    reopened = ResponseCache(path, retention=50)
+    count = reopened._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    assert count == 0
+
+
+def test_crawl_requests_use_per_endpoint_max_age(make_recommender, tmdb_stub):
+    recommender = make_recommender([dataset_movie(1)])
+    recommender._get_genres()
+    recommender._person_credits("Someone")
+    requests_before = len(tmdb_stub.requests)
+
+    # Within their max_age both are served from the on-disk cache
+    recommender._get_genres()
+    recommender._person_credits("Someone")
+    assert len(tmdb_stub.requests) == requests_before
+
+
+def test_trailer_miss_is_asked_again_after_it_expires(make_recommender, tmdb_stub):
+    recommender = make_recommender([dataset_movie(1)])
+    assert recommender.get_trailer_key(7) is None
+
+    # An hour later the in-memory miss has expired and TMDB has a trailer
+    trailer = {"site": "YouTube", "type": "Trailer", "key": "abc"}
+    tmdb_stub.lists["movie/7/videos"] = [trailer]
+    recommender._trailers.clear()
+    cache = recommender.tmdb.cache
+    cache._db.execute("UPDATE responses SET fetched_at = fetched_at - 3601")
+    cache._db.commit()
+
+    assert recommender.get_trailer_key(7) == "abc"
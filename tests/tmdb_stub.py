@@ -0,0 +1,150 @@
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PAGE_SIZE = 20  # Results per list page, as on TMDB
+CHANGES_PAGE_SIZE = 100  # Ids per movie/changes page, as on TMDB
+
+
+def movie_details(movie_id, language="en", title=None, release_date="2001-01-01"):
+    """TMDB-shaped details response (with credits and keywords appended)"""
+    title = title or f"Movie {movie_id}"
+    return {
+        "id": movie_id,
+        "title": title,
+        "original_title": title,
+        "overview": "A robot crosses space to find love",
+        "release_date": release_date,
+        "original_language": language,
+        "genres": [{"id": 28, "name": "Action"}],
+        "credits": {
+            "cast": [{"name": "Actor A"}, {"name": "Actor B"}],
+            "crew": [{"job": "Director", "name": "Director D"}],
+        },
+        "keywords": {"keywords": [{"name": "robot"}]},
+        "videos": {"results": []},
+        "poster_path": f"/{movie_id}.jpg",
+        "vote_average": 7.0,
+        "runtime": 100,
+    }
+
+
+def listing(details):
+    """List/discover result for a details response"""
+    return {
+        "id": details["id"],
+        "title": details["title"],
+        "original_title": details["original_title"],
+        "overview": details["overview"],
+        "release_date": details["release_date"],
+        "original_language": details["original_language"],
+        "genre_ids": [genre["id"] for genre in details["genres"]],
+        "poster_path": details["poster_path"],
+        "vote_average": details["vote_average"],
+    }
+
+
+class TMDBStub:
+    """
+    Local TMDB stand-in serving the endpoints ingestion and refresh use from
+    in-memory data, on an ephemeral port. Every request is recorded in
+    `requests` as (endpoint, params) for assertions.
+    """
+
+    def __init__(self):
+        self.details = {}  # Movie id -> details response
+        self.lists = {}  # Endpoint or "endpoint?k=v&..." -> list of results
+        self.changes = []  # (date "YYYY-MM-DD", movie id) in the change feed
+        self.genres = [{"id": 28, "name": "Action"}]
+        self.requests = []
+        self.fail = set()  # Endpoints answered with a 500
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                params = {name: values[0] for name, values in query.items()}
+                params.pop("api_key", None)
+                endpoint = url.path.split("/3/", 1)[-1]
+                with stub._lock:
+                    stub.requests.append((endpoint, params))
+                status, body = stub.route(endpoint, params)
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self.base_url = f"http://127.0.0.1:{self._server.server_port}/3"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def add_list(self, key, movies):
+        """Serve `movies` (details responses) as the pages of a list endpoint"""
+        self.lists[key] = [listing(movie) for movie in movies]
+        for movie in movies:
+            self.details.setdefault(movie["id"], movie)
+
+    def requested(self, endpoint):
+        """Params of every request made to `endpoint`"""
+        with self._lock:
+            return [params for name, params in self.requests if name == endpoint]
+
+    def route(self, endpoint, params):
+        """(status, body) for one request"""
+        if endpoint in self.fail:
+            return 500, {"status_message": "Internal error"}
+        page = int(params.get("page", 1))
+
+        if endpoint == "movie/changes":
+            ids = [
+                movie_id
+                for date, movie_id in self.changes
+                if params["start_date"] <= date <= params["end_date"]
+            ]
+            return 200, self._page(
+                [{"id": movie_id} for movie_id in ids], page, CHANGES_PAGE_SIZE
+            )
+        if endpoint == "genre/movie/list":
+            return 200, {"genres": self.genres}
+
+        match = re.fullmatch(r"movie/(\d+)", endpoint)
+        if match:
+            details = self.details.get(int(match.group(1)))
+            if details is None:
+                return 404, {"status_message": "Not found"}
+            return 200, details
+
+        query = "&".join(
+            f"{name}={value}"
+            for name, value in sorted(params.items())
+            if name != "page"
+        )
+        results = self.lists.get(f"{endpoint}?{query}", self.lists.get(endpoint, []))
+        return 200, self._page(results, page, PAGE_SIZE)
+
+    @staticmethod
+    def _page(results, page, size):
+        total_pages = max(1, -(-len(results) // size))
+        return {
+            "page": page,
+            "results": results[(page - 1) * size : page * size],
+            "total_pages": total_pages,
+            "total_results": len(results),
+        }
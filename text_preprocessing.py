@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from multiprocessing import get_context, parent_process
+
+import nltk
+from nltk.corpus import stopwords
+from nltk.stem import WordNetLemmatizer
+from nltk.tokenize import word_tokenize
+
+# Set custom NLTK data path for compatibility with Render
+NLTK_DATA_PATH = "/tmp/nltk_data"
+nltk.data.path.append(NLTK_DATA_PATH)
+
+# NLTK packages we use, with the resource path that proves each is installed
+NLTK_RESOURCES = {
+    "punkt": "tokenizers/punkt",
+    "punkt_tab": "tokenizers/punkt_tab",
+    "wordnet": "corpora/wordnet",
+    "stopwords": "corpora/stopwords",
+}
+
+# Bump when preprocess_text changes so cached texts are not reused
+PREPROCESS_VERSION = 1
+PARALLEL_MIN_DOCS = 5000  # Below this a process pool costs more than it saves
+MIN_CHUNK_SIZE = 200
+
+_nltk_ready = False
+_nltk_lock = threading.Lock()
+_stop_words = None
+_lemmatizer = None
+
+
+def ensure_nltk_resources():
+    """Download any missing NLTK packages once per process (no-op if present)"""
+    global _nltk_ready
+    if _nltk_ready:
+        return
+    with _nltk_lock:
+        if _nltk_ready:
+            return
+        for package, resource in NLTK_RESOURCES.items():
+            try:
+                nltk.data.find(resource)
+            except LookupError:
+                os.makedirs(NLTK_DATA_PATH, exist_ok=True)
+                nltk.download(package, download_dir=NLTK_DATA_PATH, quiet=True)
+        _nltk_ready = True
+
+
+@lru_cache(maxsize=None)
+def _lemmatize(token):
+    """Lemmatize a token; movie text is repetitive, so this is memoized"""
+    return _lemmatizer.lemmatize(token)
+
+
+def preprocess_text(text):
+    """Lowercase, tokenize, drop stopwords/non-words and lemmatize `text`"""
+    global _stop_words, _lemmatizer
+    if _stop_words is None:
+        ensure_nltk_resources()
+        _lemmatizer = WordNetLemmatizer()
+        _stop_words = set(stopwords.words("english"))
+
+    tokens = word_tokenize(text.lower())
+    return " ".join(
+        _lemmatize(token)
+        for token in tokens
+        if token.isalpha() and token not in _stop_words
+    )
+
+
+def _preprocess_chunk(texts):
+    """Process-pool worker: preprocess a list of documents"""
+    return [preprocess_text(text) for text in texts]
+
+
+def _in_worker_process():
+    """
+    Whether this is a multiprocessing child, including a spawned one that
+    is still importing the parent's main module: that import runs as
+    __mp_main__, which in any other process is an alias of __main__
+    """
+    mp_main = sys.modules.get("__mp_main__")
+    importing_main = mp_main is not None and mp_main is not sys.modules["__main__"]
+    return parent_process() is not None or importing_main
+
+
+def _preprocess_parallel(texts, workers):
+    """Preprocess `texts` in chunks over a pool of spawned worker processes"""
+    chunk_size = max(MIN_CHUNK_SIZE, len(texts) // (workers * 4))
+    chunks = [texts[i : i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    # Resources are fetched here so workers never race to download them
+    ensure_nltk_resources()
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=get_context("spawn")
+    ) as executor:
+        return [
+            text for chunk in executor.map(_preprocess_chunk, chunks) for text in chunk
+        ]
+
+
+def document_hash(text):
+    """Stable key for a document's preprocessed form"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _load_cache(path):
+    """Return the {document hash: preprocessed text} cache stored at `path`"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != PREPROCESS_VERSION:
+        return {}
+    return data.get("docs", {})
+
+
+def _save_cache(path, docs):
+    """Atomically replace the preprocessing cache file"""
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": PREPROCESS_VERSION, "docs": docs}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def preprocess_documents(texts, cache_path=None, workers=None):
+    """
+    Preprocess `texts`, reusing cached results for documents whose hash is
+    unchanged and spreading the rest over a process pool in chunks. Worker
+    processes never start a pool of their own, and a pool that breaks (e.g.
+    a worker dies while importing the main module) falls back to serial
+    processing. Returns the preprocessed texts in input order.
+    """
+    hashes = [document_hash(text) for text in texts]
+    cache = _load_cache(cache_path) if cache_path else {}
+
+    missing = {}
+    for key, text in zip(hashes, texts):
+        if key not in cache:
+            missing.setdefault(key, text)
+
+    if missing:
+        keys = list(missing)
+        pending = [missing[key] for key in keys]
+        workers = workers or os.cpu_count() or 1
+
+        processed = None
+        parallel = workers > 1 and len(pending) >= PARALLEL_MIN_DOCS
+        if parallel and not _in_worker_process():
+            try:
+                processed = _preprocess_parallel(pending, workers)
+            except BrokenProcessPool as e:
+                print(f"Preprocessing pool failed, continuing serially: {e}")
+        if processed is None:
+            processed = _preprocess_chunk(pending)
+
+        cache.update(zip(keys, processed))
+        print(
+            f"Preprocessed {len(pending)} changed documents "
+            f"({len(texts) - len(pending)} reused from cache)"
+        )
+
+    results = [cache[key] for key in hashes]
+
+    if cache_path and (missing or len(cache) != len(set(hashes))):
+        # Keep only entries for the current corpus so the cache does not grow
+        try:
+            _save_cache(cache_path, {key: cache[key] for key in hashes})
+        except OSError as e:
+            print(f"Could not save preprocessing cache: {e}")
+
+    return results
@@ -0,0 +1,213 @@
+import json
+import random
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# TMDB allows roughly 50 requests per second per IP; stay a little below that
+TMDB_RATE_LIMIT = 40  # Sustained requests per second
+TMDB_BURST = 40  # Requests allowed back-to-back before throttling kicks in
+TMDB_POOL_SIZE = 32  # Keep-alive connections shared by all worker threads
+TMDB_TIMEOUT = 10  # Seconds per HTTP request
+TMDB_MAX_RETRIES = 4
+TMDB_BACKOFF_BASE = 0.5  # Seconds, doubled on every retry
+TMDB_BACKOFF_MAX = 8.0
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every request made through a client"""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then consume it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    elapsed = now - self._updated
+                    self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Stop handing out tokens for `seconds` (used for Retry-After)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+class ResponseCache:
+    """
+    Disk-backed cache of TMDB JSON responses in SQLite, keyed by endpoint and
+    query parameters. Each entry keeps its fetch time so callers can decide
+    per request how old a response they accept. With `retention` (seconds),
+    entries older than that are deleted when the cache is opened.
+    """
+
+    def __init__(self, path, retention=None):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, fetched_at REAL NOT NULL, body TEXT NOT NULL)"
+        )
+        self._db.commit()
+        if retention is not None:
+            self.prune(retention)
+
+    @staticmethod
+    def key(endpoint, params):
+        """Cache key for an endpoint and its parameters (api_key excluded)"""
+        query = "&".join(
+            f"{name}={value}"
+            for name, value in sorted(params.items())
+            if name != "api_key"
+        )
+        return f"{endpoint}?{query}"
+
+    def get(self, key, max_age):
+        """Return the cached JSON for key if fetched within max_age seconds"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fetched_at, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[0] < time.time() - max_age:
+            return None
+        return json.loads(row[1])
+
+    def prune(self, max_age):
+        """Delete entries fetched more than max_age seconds ago; returns how many"""
+        with self._lock:
+            deleted = self._db.execute(
+                "DELETE FROM responses WHERE fetched_at < ?", (time.time() - max_age,)
+            ).rowcount
+            self._db.commit()
+        return deleted
+
+    def put(self, key, data):
+        """Store a freshly fetched response"""
+        body = json.dumps(data, ensure_ascii=False)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, fetched_at, body) "
+                "VALUES (?, ?, ?)",
+                (key, time.time(), body),
+            )
+            self._db.commit()
+
+
+class TMDBClient:
+    """Pooled keep-alive TMDB client with global rate limiting and retries"""
+
+    def __init__(
+        self,
+        api_key,
+        base_url,
+        rate=TMDB_RATE_LIMIT,
+        burst=TMDB_BURST,
+        pool_size=TMDB_POOL_SIZE,
+        max_retries=TMDB_MAX_RETRIES,
+        cache=None,
+        default_max_age=0,
+    ):
+        self.api_key = api_key
+        self.cache = cache  # Optional ResponseCache
+        self.default_max_age = default_max_age
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.bucket = TokenBucket(rate, burst)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, endpoint, params=None, max_age=None):
+        """
+        GET a TMDB endpoint and return the decoded JSON, or None on failure.
+        A cached response younger than `max_age` seconds (default_max_age if
+        None, 0 to always go to the network) is returned without a request.
+        Retries 429s (honoring Retry-After), 5xx responses and network errors
+        with jittered exponential backoff.
+        """
+        endpoint = endpoint.lstrip("/")
+        params = dict(params or {})
+        max_age = self.default_max_age if max_age is None else max_age
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ResponseCache.key(endpoint, params)
+            if max_age > 0:
+                cached = self.cache.get(cache_key, max_age)
+                if cached is not None:
+                    return cached
+
+        data = self._request(endpoint, params)
+        if data is not None and cache_key is not None:
+            self.cache.put(cache_key, data)
+        return data
+
+    def _request(self, endpoint, params):
+        """Perform the rate-limited GET with retries"""
+        url = f"{self.base_url}/{endpoint}"
+        query = dict(params)
+        query["api_key"] = self.api_key
+
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                response = self.session.get(url, params=query, timeout=TMDB_TIMEOUT)
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    print(f"Exception while fetching {endpoint}: {e}")
+                    return None
+                time.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code == 200:
+                return response.json()
+
+            if response.status_code == 429:
+                retry_after = self._retry_after(response, attempt)
+                # Pause the whole bucket so every worker backs off together
+                self.bucket.pause(retry_after)
+                if attempt < self.max_retries:
+                    continue
+            elif response.status_code >= 500 and attempt < self.max_retries:
+                time.sleep(self._backoff(attempt))
+                continue
+
+            print(f"Error {response.status_code} when fetching {endpoint}")
+            return None
+
+        return None
+
+    def _retry_after(self, response, attempt):
+        """Seconds to wait after a 429, from the Retry-After header if present"""
+        try:
+            return max(0.0, float(response.headers.get("Retry-After")))
+        except (TypeError, ValueError):
+            return self._backoff(attempt)
+
+    @staticmethod
+    def _backoff(attempt):
+        """Full-jitter exponential backoff delay for the given attempt"""
+        return random.uniform(0, min(TMDB_BACKOFF_MAX, TMDB_BACKOFF_BASE * 2**attempt))